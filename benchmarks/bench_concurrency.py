@@ -0,0 +1,107 @@
+"""
+Throughput of the async graph service at 1, 10 and 50 concurrent requests.
+
+Requests go through the wrapper's FastAPI app in-process (httpx's ASGI transport), so admission
+control, single-flight coalescing, the async checkpointer and every graph node run for real.
+Only the model endpoint and the embedding model are replaced (see tests/fakes.py); every LLM
+call sleeps for --latency seconds, like a remote completion would.
+
+Admission (ADMISSION_MAX_CONCURRENT, ADMISSION_MAX_QUEUED) and the LLM governor
+(LLM_MAX_CONCURRENT) keep their configured limits, so requests beyond the queue are counted as
+rejected (429), as a client would see them.
+
+Usage:
+    python benchmarks/bench_concurrency.py [--latency 0.2] [--levels 1 10 50]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tests"))
+from fakes import (  # isort: skip
+    QUERIES,
+    FakeLLMEndpoint,
+    isolate_environment,
+    percentile,
+    seed_corpus,
+)
+
+isolate_environment()
+
+import httpx  # isort: skip
+import legal_agent_wrapper as wrapper  # isort: skip
+from legal_modules.setup import db  # isort: skip
+
+
+async def run_level(client: httpx.AsyncClient, concurrency: int) -> dict:
+    """Send `concurrency` requests at once and time each of them."""
+
+    async def one(i: int):
+        started = time.perf_counter()
+        response = await client.post(
+            "/run-legal-graph",
+            json={
+                "query": QUERIES[i % len(QUERIES)],
+                "thread_id": str(uuid.uuid4()),
+                "bypass_cache": True,
+            },
+        )
+        return response.status_code, time.perf_counter() - started
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = await asyncio.gather(*(one(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies = [seconds for status, seconds in results if status == 200]
+    return {
+        "concurrency": concurrency,
+        "ok": len(latencies),
+        "rejected": sum(1 for status, _ in results if status == 429),
+        "failed": sum(1 for status, _ in results if status not in (200, 429)),
+        "seconds": elapsed,
+        "throughput": len(latencies) / elapsed,
+        "p50": percentile(latencies, 0.5),
+        "p95": percentile(latencies, 0.95),
+    }
+
+
+async def main(latency: float, levels: list):
+    seed_corpus(db)
+    transport = httpx.ASGITransport(app=wrapper.api)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://wrapper", timeout=None
+    ) as client:
+        with FakeLLMEndpoint(latency=latency) as endpoint:
+            # Warm up: compile the graph and open the checkpointer
+            await run_level(client, 1)
+            endpoint.reset()
+
+            rows = [await run_level(client, level) for level in levels]
+
+    await wrapper.close_app()
+
+    print(f"Model latency {latency:.3f}s per call")
+    print(
+        f"{'concurrency':>11} {'ok':>4} {'429':>4} {'failed':>6} "
+        f"{'req/s':>7} {'p50 s':>7} {'p95 s':>7}"
+    )
+    for row in rows:
+        print(
+            f"{row['concurrency']:>11} {row['ok']:>4} {row['rejected']:>4} {row['failed']:>6} "
+            f"{row['throughput']:>7.2f} {row['p50']:>7.3f} {row['p95']:>7.3f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 10, 50])
+    args = parser.parse_args()
+    asyncio.run(main(args.latency, args.levels))
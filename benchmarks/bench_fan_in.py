@@ -0,0 +1,168 @@
+"""
+Supersteps, node runs and checkpoint writes per graph run, fan-in edge versus join gate.
+
+Compiles two versions of the legal graph on a counting in-memory checkpointer:
+- fan-in: the current graph, where synthesis waits on both analysis branches through one edge
+- gate: the graph as it was before, with a parallel_join_gate node that both branches enter
+  and that loops on itself ("wait") until every branch has reported done
+
+Each runs the fixed query set through the full analysis path (all actions) with the fake model
+endpoint of tests/fakes.py, once with an audit that passes and once with an audit that asks for
+one review pass.
+
+Usage:
+    python benchmarks/bench_fan_in.py [--latency 0.05]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tests"))
+from fakes import (  # isort: skip
+    QUERIES,
+    FakeLLMEndpoint,
+    isolate_environment,
+    seed_corpus,
+)
+
+isolate_environment()
+
+from langchain_core.messages import AIMessage  # isort: skip
+from langgraph.checkpoint.memory import InMemorySaver  # isort: skip
+from legal_modules.graph_builder import build_legal_graph  # isort: skip
+from legal_modules.setup import db  # isort: skip
+
+BRANCHES = ["risk_and_remediation_assessor", "precedent_matcher"]
+
+
+class CountingSaver(InMemorySaver):
+    """Counts checkpoints (one per superstep) and pending writes."""
+
+    def __init__(self):
+        super().__init__()
+        self.checkpoint_count = 0
+        self.write_count = 0
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        self.checkpoint_count += 1
+        return await super().aput(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        self.write_count += len(writes)
+        return await super().aput_writes(config, writes, task_id, task_path)
+
+
+def parallel_join_gate(state: dict) -> dict:
+    return {}
+
+
+def build_gated_graph():
+    """The fan-in as it was: both branches enter a gate that re-runs until all are done."""
+    workflow = build_legal_graph()
+    workflow.waiting_edges.clear()
+    workflow.add_node("parallel_join_gate", parallel_join_gate)
+    for branch in BRANCHES:
+        workflow.add_edge(branch, "parallel_join_gate")
+    workflow.add_conditional_edges(
+        "parallel_join_gate",
+        lambda state: (
+            "continue"
+            if all(
+                state.get(flag)
+                for flag in ("doctrinal_done", "precedent_done", "remediation_done")
+            )
+            else "wait"
+        ),
+        {"continue": "synthesize_verdict", "wait": "parallel_join_gate"},
+    )
+    return workflow
+
+
+def audit_replies(reviews: int):
+    """Audits that fail the first `reviews` times before passing."""
+    audits = 0
+
+    def reply(prompt: str, kwargs: dict) -> AIMessage:
+        nonlocal audits
+        audits += 1
+        confidence = 40 + audits if audits <= reviews else 90
+        return AIMessage(
+            content=json.dumps(
+                {
+                    "contradiction_score": 5,
+                    "confidence": confidence,
+                    "issues": ["Cite the notice provision."],
+                }
+            )
+        )
+
+    return reply
+
+
+async def measure(workflow, reviews: int, latency: float) -> dict:
+    saver = CountingSaver()
+    app = workflow.compile(checkpointer=saver)
+    nodes = 0
+    started = time.perf_counter()
+    for query in QUERIES:
+        with FakeLLMEndpoint(
+            latency=latency,
+            replies={"consistency_auditor_and_cite": audit_replies(reviews)},
+        ):
+            config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+            graph_input = {
+                "input_query": query,
+                "bypass_answer_cache": True,
+                "degradations": None,
+            }
+            with contextlib.redirect_stdout(io.StringIO()):
+                async for update in app.astream(
+                    graph_input, config=config, stream_mode="updates"
+                ):
+                    nodes += len(update)
+
+    runs = len(QUERIES)
+    return {
+        "supersteps": saver.checkpoint_count / runs,
+        "nodes": nodes / runs,
+        "writes": saver.write_count / runs,
+        "ms": (time.perf_counter() - started) * 1000 / runs,
+    }
+
+
+async def main(latency: float):
+    seed_corpus(db)
+    variants = {"fan-in": build_legal_graph, "gate": build_gated_graph}
+
+    # Warm up the model clients and the embedding path
+    await measure(build_legal_graph(), 0, 0)
+
+    rows = []
+    for reviews in (0, 1):
+        for name, build in variants.items():
+            rows.append((name, reviews, await measure(build(), reviews, latency)))
+
+    print(f"Per run, averaged over {len(QUERIES)} runs, model latency {latency:.3f}s")
+    print(
+        f"{'graph':>7} {'reviews':>7} {'supersteps':>10} {'node runs':>9} "
+        f"{'writes':>7} {'ms/run':>8}"
+    )
+    for name, reviews, row in rows:
+        print(
+            f"{name:>7} {reviews:>7} {row['supersteps']:>10.1f} {row['nodes']:>9.1f} "
+            f"{row['writes']:>7.1f} {row['ms']:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+    asyncio.run(main(args.latency))
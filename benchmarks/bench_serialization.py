@@ -0,0 +1,108 @@
+"""
+Size and serialisation time of the /run-legal-graph response body.
+
+Runs a conversation of --turns questions on one thread through the graph (fake model endpoint,
+see tests/fakes.py), so the state carries a growing chat history, retrieved documents and every
+intermediate analysis. The final state of each turn is then serialised two ways:
+- full: the whole state through FastAPI's jsonable_encoder and JSONResponse, as before fields existed
+- projected: project_result with DEFAULT_RESULT_FIELDS and compact_json_response, as now
+
+Usage:
+    python benchmarks/bench_serialization.py [--turns 5] [--repeat 200]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tests"))
+from fakes import (  # isort: skip
+    QUERIES,
+    FakeLLMEndpoint,
+    isolate_environment,
+    seed_corpus,
+)
+
+isolate_environment()
+
+import legal_agent_wrapper as wrapper  # isort: skip
+from fastapi.encoders import jsonable_encoder  # isort: skip
+from fastapi.responses import JSONResponse  # isort: skip
+from legal_modules.setup import db  # isort: skip
+
+
+def serialise_full(thread_id: str, state: dict) -> bytes:
+    response = {"status": "success", "thread_id": thread_id, "result": state}
+    return JSONResponse(jsonable_encoder(response)).body
+
+
+def serialise_projected(thread_id: str, state: dict) -> bytes:
+    response = {
+        "status": "success",
+        "thread_id": thread_id,
+        "result": wrapper.project_result(state),
+    }
+    return wrapper.compact_json_response(response).body
+
+
+def time_per_call(serialise, thread_id: str, state: dict, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        serialise(thread_id, state)
+    return (time.perf_counter() - started) / repeat
+
+
+async def main(turns: int, repeat: int):
+    seed_corpus(db)
+    thread_id = str(uuid.uuid4())
+    rows = []
+
+    with FakeLLMEndpoint(latency=0):
+        app = await wrapper.get_app()
+        for turn in range(turns):
+            payload = wrapper.GraphRequest(
+                query=QUERIES[turn % len(QUERIES)], bypass_cache=True
+            )
+            graph_input, config = wrapper.build_graph_run(payload, thread_id)
+            with contextlib.redirect_stdout(io.StringIO()):
+                state = await app.ainvoke(graph_input, config=config)
+
+            rows.append(
+                {
+                    "turn": turn + 1,
+                    "messages": len(state.get("messages", [])),
+                    "full_bytes": len(serialise_full(thread_id, state)),
+                    "projected_bytes": len(serialise_projected(thread_id, state)),
+                    "full_ms": time_per_call(serialise_full, thread_id, state, repeat)
+                    * 1000,
+                    "projected_ms": time_per_call(
+                        serialise_projected, thread_id, state, repeat
+                    )
+                    * 1000,
+                }
+            )
+
+    await wrapper.close_app()
+
+    print(
+        f"{'turn':>4} {'messages':>8} {'full KB':>8} {'proj KB':>8} {'full ms':>8} {'proj ms':>8}"
+    )
+    for row in rows:
+        print(
+            f"{row['turn']:>4} {row['messages']:>8} "
+            f"{row['full_bytes'] / 1024:>8.1f} {row['projected_bytes'] / 1024:>8.1f} "
+            f"{row['full_ms']:>8.3f} {row['projected_ms']:>8.3f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.turns, args.repeat))
@@ -0,0 +1,140 @@
+"""
+Reuse rate and saved retrieval time of speculative retrieval.
+
+Runs the graph over the fixed query set with four kinds of query decomposition:
+- verbatim: the optimised query is the user's question
+- normalised: the question lower-cased and without its question mark
+- rephrased: the optimised query keeps the question's terms in a different wording
+- reframed: the optimised query drops the question's terms for generic legal wording
+
+Speculative retrieval for the raw question starts alongside decomposition; the retriever reuses
+its documents when the optimised query stays close enough (SPECULATIVE_REUSE_THRESHOLD, set it in
+the environment to try other thresholds). Model
+calls and embeddings are the offline stand-ins of tests/fakes.py; every embedding sleeps for
+--embed-latency seconds, like a call to a hosted or CPU-bound embedding model.
+
+Usage:
+    python benchmarks/bench_speculation.py [--rounds 2] [--latency 0.05] [--embed-latency 0.05]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tests"))
+from fakes import (  # isort: skip
+    DEFAULT_ACTIONS,
+    QUERIES,
+    FakeLLMEndpoint,
+    HashEmbeddings,
+    default_reply,
+    isolate_environment,
+    seed_corpus,
+)
+
+isolate_environment()
+
+import legal_agent_wrapper as wrapper  # isort: skip
+from langchain_core.messages import AIMessage  # isort: skip
+from legal_modules.setup import db  # isort: skip
+from legal_modules.speculation import speculation_stats  # isort: skip
+
+REWRITES = {
+    "verbatim": lambda query: query,
+    "normalised": lambda query: query.rstrip("?").lower(),
+    "rephrased": lambda query: "Under Indian law, "
+    + query.replace("What does the law say about ", "the legal position on ").rstrip(
+        "?"
+    ),
+    "reframed": lambda query: "Applicable statutory provisions and judicial precedents",
+}
+
+
+def decomposition(rewrite):
+    def reply(prompt: str, kwargs: dict) -> AIMessage:
+        result = json.loads(
+            default_reply("decompose_to_analysis_units", prompt, DEFAULT_ACTIONS)
+        )
+        result["optimised_query"] = rewrite(result["optimised_query"])
+        return AIMessage(content=json.dumps(result))
+
+    return reply
+
+
+def slow_embeddings(seconds: float):
+    embed_query = HashEmbeddings.embed_query
+
+    def embed(self, text: str) -> list:
+        time.sleep(seconds)
+        return embed_query(self, text)
+
+    HashEmbeddings.embed_query = embed
+
+
+async def run_kind(name: str, rounds: int, latency: float) -> dict:
+    before = speculation_stats.metrics()
+    started = time.perf_counter()
+    runs = 0
+    with FakeLLMEndpoint(
+        latency=latency,
+        replies={"decompose_to_analysis_units": decomposition(REWRITES[name])},
+    ):
+        for _ in range(rounds):
+            for query in QUERIES:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    await wrapper.execute_graph(
+                        wrapper.GraphRequest(
+                            query=query,
+                            thread_id=str(uuid.uuid4()),
+                            bypass_cache=True,
+                        )
+                    )
+                runs += 1
+    after = speculation_stats.metrics()
+
+    reused = after["reused"] - before["reused"]
+    discarded = after["discarded"] - before["discarded"]
+    return {
+        "kind": name,
+        "runs": runs,
+        "reuse_rate": reused / (reused + discarded) if reused + discarded else 0.0,
+        "saved_ms": (after["saved_seconds"] - before["saved_seconds"]) * 1000 / runs,
+        "run_ms": (time.perf_counter() - started) * 1000 / runs,
+    }
+
+
+async def main(rounds: int, latency: float, embed_latency: float):
+    seed_corpus(db)
+    slow_embeddings(embed_latency)
+
+    # Warm up: compile the graph and open the checkpointer
+    await run_kind("verbatim", 1, 0)
+    rows = [await run_kind(name, rounds, latency) for name in REWRITES]
+    await wrapper.close_app()
+
+    print(
+        f"Model latency {latency:.3f}s per call, embedding latency {embed_latency:.3f}s"
+    )
+    print(
+        f"{'decomposition':>13} {'runs':>5} {'reuse':>6} {'saved ms/run':>12} {'ms/run':>8}"
+    )
+    for row in rows:
+        print(
+            f"{row['kind']:>13} {row['runs']:>5} {row['reuse_rate']:>6.0%} "
+            f"{row['saved_ms']:>12.1f} {row['run_ms']:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--embed-latency", type=float, default=0.05)
+    args = parser.parse_args()
+    asyncio.run(main(args.rounds, args.latency, args.embed_latency))
@@ -0,0 +1,175 @@
+"""
+Cost of reaching the legal graph from the API server, per transport.
+
+Compares three ways fastapi_legal can call the graph:
+- per-request: a new httpx.AsyncClient for every call, as before graph_transport existed
+- pooled: HttpGraphTransport, one keep-alive client for the app lifetime
+- inprocess: InProcessGraphTransport, the graph awaited inside the calling process
+
+The HTTP variants talk to a wrapper started in a subprocess (`--serve`). Both processes replace
+the model endpoint and the embedding model with the offline stand-ins of tests/fakes.py, with a
+small model latency so transport overhead stays visible next to the graph itself.
+
+Usage:
+    python benchmarks/bench_transport.py [--requests 40] [--concurrency 1 10] [--latency 0.01]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tests"))
+from fakes import (  # isort: skip
+    QUERIES,
+    FakeLLMEndpoint,
+    isolate_environment,
+    percentile,
+    seed_corpus,
+)
+
+isolate_environment()
+
+
+def serve(port: int, latency: float):
+    """Run the wrapper service with the fake model endpoint."""
+    import uvicorn
+    from legal_agent_wrapper import api
+    from legal_modules.setup import db
+
+    seed_corpus(db)
+    FakeLLMEndpoint(latency=latency).install()
+    with contextlib.redirect_stdout(io.StringIO()):
+        uvicorn.run(api, host="127.0.0.1", port=port, log_level="warning")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_up(base_url: str, timeout: float = 120):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            with contextlib.suppress(httpx.TransportError):
+                if (await client.get("/stats")).status_code == 200:
+                    return
+            await asyncio.sleep(0.5)
+    raise RuntimeError("The wrapper service did not start")
+
+
+class PerRequestClientTransport:
+    """The pre-graph_transport behaviour: a fresh client, and connection, for every call."""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+
+    async def run_graph(self, payload: dict) -> dict:
+        import httpx
+
+        async with httpx.AsyncClient(
+            base_url=self.base_url, timeout=httpx.Timeout(120.0, connect=60.0)
+        ) as client:
+            response = await client.post("/run-legal-graph", json=payload)
+            response.raise_for_status()
+            return response.json()
+
+    async def aclose(self):
+        pass
+
+
+async def measure(transport, requests: int, concurrency: int) -> dict:
+    """Run `requests` graph calls, `concurrency` at a time."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int):
+        async with semaphore:
+            started = time.perf_counter()
+            await transport.run_graph(
+                {
+                    "query": QUERIES[i % len(QUERIES)],
+                    "thread_id": str(uuid.uuid4()),
+                    "bypass_cache": True,
+                }
+            )
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    return {
+        "throughput": requests / elapsed,
+        "p50": percentile(latencies, 0.5),
+        "p95": percentile(latencies, 0.95),
+    }
+
+
+async def main(requests: int, levels: list, latency: float):
+    from graph_transport import HttpGraphTransport, InProcessGraphTransport
+    from legal_modules.setup import db
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [sys.executable, __file__, "--serve", str(port), "--latency", str(latency)]
+    )
+    try:
+        await wait_until_up(base_url)
+
+        seed_corpus(db)
+        endpoint = FakeLLMEndpoint(latency=latency).install()
+        transports = {
+            "per-request": PerRequestClientTransport(base_url),
+            "pooled": HttpGraphTransport(base_url),
+            "inprocess": InProcessGraphTransport(),
+        }
+
+        rows = []
+        for name, transport in transports.items():
+            # Warm up connections, the compiled graph and the checkpointer
+            await measure(transport, 2, 1)
+            for concurrency in levels:
+                rows.append(
+                    (name, concurrency, await measure(transport, requests, concurrency))
+                )
+            await transport.aclose()
+        endpoint.uninstall()
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"{requests} requests per row, model latency {latency:.3f}s per call")
+    print(
+        f"{'transport':>12} {'concurrency':>11} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8}"
+    )
+    for name, concurrency, row in rows:
+        print(
+            f"{name:>12} {concurrency:>11} {row['throughput']:>7.2f} "
+            f"{row['p50'] * 1000:>8.1f} {row['p95'] * 1000:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--latency", type=float, default=0.01)
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.latency)
+    else:
+        asyncio.run(main(args.requests, args.concurrency, args.latency))
@@ -0,0 +1,189 @@
+"""
+Event loop blocking of the voice endpoint under concurrent voice requests.
+
+Compares, with local stand-ins for the speech APIs:
+- blocking: the flow before the voice pipeline was moved off the event loop, which called the
+  synchronous Groq transcription and gTTS directly inside the async handler
+- current: the /api/voice handler, which runs both in worker threads and streams the MP3 back
+
+The stand-ins keep the real call shapes: a Groq client whose audio.transcriptions.create sleeps
+like a network call, and a gTTS class whose write_to_fp sleeps per character. The graph run and
+the summariser are async sleeps. While --concurrency voice requests run together, a ticker that
+wakes every 10 ms records how late the event loop lets it run: that lag is what every other
+request served by the process (text analyses, streams, polls) waits on top of its own work.
+
+Usage:
+    python benchmarks/bench_voice_blocking.py [--concurrency 1 4 8] [--transcribe 0.3] [--tts 0.004]
+        [--graph 1.0]
+"""
+
+import argparse
+import asyncio
+import base64
+import contextlib
+import io
+import os
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tests"))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "fastapi_server"))
+from fakes import SUMMARY, VERDICT, percentile  # isort: skip
+
+os.environ.setdefault("GROQ_API_KEY", "gsk-offline")
+
+import fastapi_legal  # isort: skip
+from fastapi import UploadFile  # isort: skip
+
+TICK_SECONDS = 0.01
+
+
+class StubGroq:
+    """A Groq client whose transcription blocks its caller like the real HTTP call."""
+
+    def __init__(self, seconds: float):
+        self.audio = SimpleNamespace(transcriptions=SimpleNamespace(create=self.create))
+        self.seconds = seconds
+
+    def create(self, file, model: str, response_format: str):
+        time.sleep(self.seconds)
+        return SimpleNamespace(text="Can my employer dismiss me without notice?")
+
+
+def stub_gtts(seconds_per_char: float):
+    class StubTTS:
+        """gTTS round trip: a fixed request cost plus the length of the text."""
+
+        def __init__(self, text: str, lang: str):
+            self.text = text
+
+        def write_to_fp(self, fp):
+            time.sleep(0.15 + seconds_per_char * len(self.text))
+            fp.write(b"\xff\xf3" + self.text.encode())
+
+    return StubTTS
+
+
+class StubGraphTransport:
+    """Answers graph runs and summaries after async delays, like the graph service."""
+
+    def __init__(self, graph_seconds: float):
+        self.graph_seconds = graph_seconds
+
+    async def run_graph(self, payload: dict) -> dict:
+        await asyncio.sleep(self.graph_seconds)
+        return {
+            "status": "success",
+            "result": {"final_response": VERDICT, "voice_summary": SUMMARY},
+        }
+
+    async def stream_summary(self, payload: dict):
+        await asyncio.sleep(0.2)
+        yield SUMMARY
+
+    async def aclose(self):
+        pass
+
+
+async def blocking():
+    """The handler before the change: synchronous speech calls on the event loop, base64 JSON."""
+    audio = b"RIFF"
+    transcription = fastapi_legal.client.audio.transcriptions.create(
+        file=("audio.wav", audio),
+        model="whisper-large-v3",
+        response_format="verbose_json",
+    )
+    result = await fastapi_legal.graph_transport.run_graph(
+        {"query": transcription.text}
+    )
+    summary = "".join(
+        [
+            text
+            async for text in fastapi_legal.graph_transport.stream_summary(
+                {"query": transcription.text, "response": result["result"]}
+            )
+        ]
+    )
+    mp3 = io.BytesIO()
+    fastapi_legal.gTTS(text=summary, lang="en").write_to_fp(mp3)
+    return base64.b64encode(mp3.getvalue())
+
+
+async def current():
+    """The current /api/voice handler, drained to its last audio chunk."""
+    response = await fastapi_legal.analyze_voice(
+        audio_file=UploadFile(io.BytesIO(b"RIFF"), filename="audio.wav"),
+        thread_id=None,
+        file=None,
+    )
+    async for _ in response.body_iterator:
+        pass
+
+
+async def ticker(lags: list, stop: asyncio.Event):
+    while not stop.is_set():
+        expected = time.perf_counter() + TICK_SECONDS
+        await asyncio.sleep(TICK_SECONDS)
+        lags.append(max(0.0, time.perf_counter() - expected))
+
+
+async def measure(flow, concurrency: int) -> dict:
+    lags, stop = [], asyncio.Event()
+    ticks = asyncio.create_task(ticker(lags, stop))
+    latencies = []
+
+    async def timed_request():
+        started = time.perf_counter()
+        await flow()
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        await asyncio.gather(*(timed_request() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    stop.set()
+    await ticks
+
+    return {
+        "wall": wall,
+        "p50": percentile(latencies, 0.5),
+        "lag_p95": percentile(lags, 0.95) * 1000,
+        "lag_max": max(lags) * 1000,
+    }
+
+
+async def main(concurrency: list, transcribe: float, tts: float, graph: float):
+    fastapi_legal.client = StubGroq(transcribe)
+    fastapi_legal.gTTS = stub_gtts(tts)
+    fastapi_legal.graph_transport = StubGraphTransport(graph)
+
+    rows = []
+    for count in concurrency:
+        for name, flow in (("blocking", blocking), ("current", current)):
+            rows.append((name, count, await measure(flow, count)))
+
+    print(
+        f"transcription {transcribe:.2f}s, TTS 0.15s + {tts:.3f}s/char, graph {graph:.2f}s, "
+        f"ticker every {TICK_SECONDS * 1000:.0f} ms"
+    )
+    print(
+        f"{'flow':>8} {'requests':>8} {'wall s':>7} {'p50 s':>6} "
+        f"{'loop lag p95 ms':>15} {'loop lag max ms':>15}"
+    )
+    for name, count, row in rows:
+        print(
+            f"{name:>8} {count:>8} {row['wall']:>7.2f} {row['p50']:>6.2f} "
+            f"{row['lag_p95']:>15.1f} {row['lag_max']:>15.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--transcribe", type=float, default=0.3)
+    parser.add_argument("--tts", type=float, default=0.004)
+    parser.add_argument("--graph", type=float, default=1.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.concurrency, args.transcribe, args.tts, args.graph))
@@ -0,0 +1,145 @@
+"""
+Time to first audio of the voice endpoint.
+
+Compares, with the same stubbed graph, summariser and TTS latencies:
+- serial: the flow before sentence pipelining, which waited for the whole spoken summary and
+  then synthesised it, so the first audio follows the last summary token
+- streamed summary: /api/voice speaking each sentence of the streaming summariser as it completes
+- graph summary: /api/voice speaking the voice summary the graph already returned
+
+The endpoint handler is called directly and its body iterator read, so the times are the
+server's, without client buffering. Transcription, the graph run, the summariser and gTTS
+are replaced by sleeps; nothing leaves the process.
+
+Usage:
+    python benchmarks/bench_voice_ttfa.py [--runs 5] [--graph 1.0] [--token 0.03]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tests"))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "fastapi_server"))
+from fakes import SUMMARY, VERDICT, percentile  # isort: skip
+
+os.environ.setdefault("GROQ_API_KEY", "gsk-offline")
+
+import fastapi_legal  # isort: skip
+from fastapi import UploadFile  # isort: skip
+
+
+class StubGraphTransport:
+    """Answers graph runs after a fixed delay and streams the summary token by token."""
+
+    def __init__(self, graph_seconds: float, token_seconds: float, voice_summary: bool):
+        self.graph_seconds = graph_seconds
+        self.token_seconds = token_seconds
+        self.voice_summary = voice_summary
+
+    async def run_graph(self, payload: dict) -> dict:
+        await asyncio.sleep(self.graph_seconds)
+        result = {"final_response": VERDICT}
+        if self.voice_summary:
+            result["voice_summary"] = SUMMARY
+        return {"status": "success", "result": result}
+
+    async def stream_summary(self, payload: dict):
+        for token in SUMMARY.split(" "):
+            await asyncio.sleep(self.token_seconds)
+            yield token + " "
+
+    async def aclose(self):
+        pass
+
+
+def stub_speech(seconds_per_char: float):
+    def synthesize_speech(text: str) -> bytes:
+        # gTTS round trip: a fixed request cost plus the length of the text
+        time.sleep(0.15 + seconds_per_char * len(text))
+        return b"\xff\xf3" + text.encode()
+
+    return synthesize_speech
+
+
+async def stub_transcription(filename: str, audio_bytes: bytes) -> str:
+    await asyncio.sleep(0.3)
+    return "Can my employer dismiss me without notice?"
+
+
+async def serial(transport: StubGraphTransport) -> tuple:
+    """The pre-pipelining flow: whole summary, then speech, then the response starts."""
+    started = time.perf_counter()
+    user_text = await stub_transcription("audio.wav", b"")
+    result = (await transport.run_graph({"query": user_text}))["result"]
+    summary = "".join(
+        [text async for text in transport.stream_summary({"query": user_text})]
+    )
+    first = await asyncio.to_thread(
+        fastapi_legal.synthesize_speech,
+        next(iter(fastapi_legal.SENTENCE_END.split(summary.strip()))),
+    )
+    first_audio = time.perf_counter() - started
+    for sentence in fastapi_legal.SENTENCE_END.split(summary.strip())[1:]:
+        await asyncio.to_thread(fastapi_legal.synthesize_speech, sentence)
+    return first_audio, time.perf_counter() - started
+
+
+async def pipelined(transport: StubGraphTransport) -> tuple:
+    """The current /api/voice handler."""
+    fastapi_legal.graph_transport = transport
+    started = time.perf_counter()
+    response = await fastapi_legal.analyze_voice(
+        audio_file=UploadFile(io.BytesIO(b"RIFF"), filename="audio.wav"),
+        thread_id=None,
+        file=None,
+    )
+    chunks = response.body_iterator
+    await anext(chunks)
+    first_audio = time.perf_counter() - started
+    async for _ in chunks:
+        pass
+    return first_audio, time.perf_counter() - started
+
+
+async def main(runs: int, graph_seconds: float, token_seconds: float):
+    fastapi_legal.transcribe_audio = stub_transcription
+    fastapi_legal.synthesize_speech = stub_speech(0.004)
+
+    variants = {
+        "serial": (serial, False),
+        "streamed summary": (pipelined, False),
+        "graph summary": (pipelined, True),
+    }
+    rows = []
+    for name, (flow, voice_summary) in variants.items():
+        transport = StubGraphTransport(graph_seconds, token_seconds, voice_summary)
+        samples = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(runs):
+                samples.append(await flow(transport))
+        first = [s[0] for s in samples]
+        total = [s[1] for s in samples]
+        rows.append((name, percentile(first, 0.5), percentile(total, 0.5)))
+
+    print(
+        f"graph {graph_seconds:.2f}s, summary token {token_seconds:.3f}s, "
+        f"{len(SUMMARY.split(' '))} tokens, {runs} runs"
+    )
+    print(f"{'flow':>16} {'first audio s':>13} {'last audio s':>12}")
+    for name, first_audio, last_audio in rows:
+        print(f"{name:>16} {first_audio:>13.3f} {last_audio:>12.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--graph", type=float, default=1.0)
+    parser.add_argument("--token", type=float, default=0.03)
+    args = parser.parse_args()
+    asyncio.run(main(args.runs, args.graph, args.token))
@@ -1,25 +1,56 @@
-import base64
+import asyncio
+import hashlib
 import os
-import shutil
+import re
+import sys
+import time
 import uuid
+from contextlib import asynccontextmanager
+from io import BytesIO
 from pathlib import Path
 from typing import Optional
 
+import httpx
 from dotenv import load_dotenv
-from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import (
+    FileResponse,
+    JSONResponse,
+    PlainTextResponse,
+    StreamingResponse,
+)
 from groq import Groq
 from gtts import gTTS
 from pydantic import BaseModel
 
+from graph_transport import GRAPH_DIR, GraphBusy, create_graph_transport, error_event
+
+# The timing collector is shared with the graph service and has no dependencies of its own
+if str(GRAPH_DIR) not in sys.path:
+    sys.path.insert(0, str(GRAPH_DIR))
+from legal_modules.timing import timed, timings  # isort: skip
+
 load_dotenv()
 
-api = FastAPI(title="Legal Voice Assistant Backend")
+graph_transport = create_graph_transport()
+
+
+@asynccontextmanager
+async def lifespan(api: FastAPI):
+    yield
+    # Release pooled connections to the graph service on shutdown
+    await graph_transport.aclose()
+
+
+api = FastAPI(title="Legal Voice Assistant Backend", lifespan=lifespan)
 
 client = Groq()
 
-UPLOAD_DIR = Path("../user_uploaded_pdfs")
+# Shared with the graph service, which trusts the content-hash names of the files stored here
+UPLOAD_DIR = Path(
+    os.getenv("LEGAL_UPLOAD_DIR") or GRAPH_DIR.parent / "user_uploaded_pdfs"
+)
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
 api.add_middleware(
@@ -28,67 +59,273 @@ api.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["X-AI-Result", "X-Thread-ID"],
+    expose_headers=["X-Thread-ID", "X-Degradations"],
 )
 
 
+@api.middleware("http")
+async def time_requests(request: Request, call_next):
+    """Time every request by route template. Streaming responses are timed until their headers are sent."""
+    started = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    timings.observe(
+        "http",
+        f"{request.method} {route.path if route else 'unmatched'}",
+        time.perf_counter() - started,
+        error=response.status_code >= 500,
+    )
+    return response
+
+
+@api.get("/metrics")
+async def metrics():
+    """
+    Latency histograms and error counts of this service in the Prometheus text format.
+
+    Returns:
+    PlainTextResponse: The metrics.
+    """
+    return PlainTextResponse(
+        timings.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 class GraphRequest(BaseModel):
     query: str
     doc_path: Optional[str] = None
     thread_id: Optional[str] = None
 
 
-import httpx
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 
+# Sentence boundary used to hand the streamed summary to TTS
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
 
-async def run_graph_logic(query: str, thread_id: str, doc_path: Optional[str] = None):
-    payload = {"query": query, "thread_id": thread_id, "doc_path": doc_path}
 
-    timeout = httpx.Timeout(120.0, connect=60.0)
+async def save_upload(file: UploadFile) -> Path:
+    """
+    Stream an uploaded document to disk while hashing it, and store it under its content hash.
+    Re-uploading identical bytes resolves to the existing file.
 
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        try:
-            print(f"--- Sending to Wrapper: {query[:50]}... ---")
-            response = await client.post(
-                "http://localhost:8787/run-legal-graph", json=payload
-            )
-            print(f"--- Received from Wrapper: {response.status_code} ---")
-            response.raise_for_status()
-            data = response.json()
-
-            return data.get("result", {}).get(
-                "final_response", "No response from graph."
-            )
-        except httpx.HTTPStatusError as e:
-            print(f"Wrapper Server Error: {e.response.text}")
-            return f"Error from legal graph: {e.response.status_code}"
-        except Exception as e:
-            print(f"Connection Error: {e}")
-            return "Failed to connect to the legal graph server."
-
-
-async def summarise_response(query: str, response: str):
+    Parameters:
+    file (UploadFile): The uploaded document.
+
+    Returns:
+    Path: The content-addressed path of the stored document.
+    """
+    digest = hashlib.sha256()
+    temp_path = UPLOAD_DIR / f".{uuid.uuid4()}.part"
+
+    try:
+        with open(temp_path, "wb") as buffer:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                digest.update(chunk)
+                buffer.write(chunk)
+
+        file_path = (
+            UPLOAD_DIR / f"{digest.hexdigest()}{Path(file.filename or '').suffix}"
+        )
+        if file_path.exists():
+            temp_path.unlink()
+        else:
+            os.replace(temp_path, file_path)
+    finally:
+        if temp_path.exists():
+            temp_path.unlink()
+
+    return file_path
+
+
+async def run_graph_logic(
+    query: str,
+    thread_id: str,
+    doc_path: Optional[str] = None,
+    priority: str = "text",
+    request_id: Optional[str] = None,
+    deadline_seconds: Optional[float] = None,
+) -> dict:
+    """
+    Run the legal graph and return its result fields.
+    Errors are reported in `final_response` so callers can always show it to the user.
+    """
+    payload = {
+        "query": query,
+        "thread_id": thread_id,
+        "doc_path": doc_path,
+        "priority": priority,
+        "request_id": request_id,
+        "deadline_seconds": deadline_seconds,
+    }
+
+    try:
+        print(f"--- Sending to Wrapper: {query[:50]}... ---")
+        data = await graph_transport.run_graph(payload)
+        print("--- Received from Wrapper ---")
+
+        result = data.get("result") or {}
+        result.setdefault("final_response", "No response from graph.")
+        return result
+    except GraphBusy:
+        raise
+    except httpx.HTTPStatusError as e:
+        print(f"Wrapper Server Error: {e.response.text}")
+        return {"final_response": f"Error from legal graph: {e.response.status_code}"}
+    except Exception as e:
+        print(f"Connection Error: {e}")
+        return {"final_response": "Failed to connect to the legal graph server."}
+
+
+async def stream_graph_logic(
+    query: str,
+    thread_id: str,
+    doc_path: Optional[str] = None,
+    deadline_seconds: Optional[float] = None,
+):
+    """
+    Proxy the NDJSON event stream of the legal graph from the wrapper.
+
+    Parameters:
+    query (str): The user query.
+    thread_id (str): The thread id of the conversation.
+    doc_path (Optional[str]): Path of the uploaded document, if any.
+    deadline_seconds (Optional[float]): Seconds before the graph starts skipping optional work.
+
+    Yields:
+    bytes: NDJSON lines as received from the wrapper, the final event lists the degradations applied.
+    """
+    payload = {
+        "query": query,
+        "thread_id": thread_id,
+        "doc_path": doc_path,
+        "deadline_seconds": deadline_seconds,
+    }
+
+    try:
+        print(f"--- Streaming from Wrapper: {query[:50]}... ---")
+        async for line in graph_transport.stream_graph(payload):
+            yield (line + "\n").encode()
+    except GraphBusy as e:
+        yield (error_event(f"{e} (retry after {e.retry_after}s)") + "\n").encode()
+    except httpx.HTTPStatusError as e:
+        print(f"Wrapper Server Error: {e.response.status_code}")
+        yield (
+            error_event(f"Error from legal graph: {e.response.status_code}") + "\n"
+        ).encode()
+    except Exception as e:
+        print(f"Connection Error: {e}")
+        yield (
+            error_event("Failed to connect to the legal graph server.") + "\n"
+        ).encode()
+
+
+async def transcribe_audio(filename: str, audio_bytes: bytes) -> str:
+    """
+    Transcribe recorded audio with Groq Whisper without blocking the event loop.
+
+    Parameters:
+    filename (str): Name of the uploaded audio, used by the API to detect the format.
+    audio_bytes (bytes): The recorded audio.
+
+    Returns:
+    str: The transcribed text.
+    """
+    print("GROQ REQUEST")
+    with timed("transcription", "whisper-large-v3"):
+        transcription = await asyncio.to_thread(
+            client.audio.transcriptions.create,
+            file=(filename, audio_bytes),
+            model="whisper-large-v3",
+            response_format="verbose_json",
+        )
+    print("GROQ RESPONSE")
+    return transcription.text
+
+
+async def stream_summary_sentences(query: str, response: str):
+    """
+    Stream the spoken summary from the summariser and yield it one complete sentence at a time.
+
+    Parameters:
+    query (str): The user query.
+    response (str): The legal analysis to summarise.
+
+    Yields:
+    str: Complete sentences of the summary.
+    """
     payload = {"query": query, "response": response}
+    buffer = ""
+
+    async for text in graph_transport.stream_summary(payload):
+        buffer += text
+        *sentences, buffer = SENTENCE_END.split(buffer)
+        for sentence in sentences:
+            if sentence.strip():
+                yield sentence.strip()
+
+    if buffer.strip():
+        yield buffer.strip()
+
 
-    timeout = httpx.Timeout(120.0, connect=60.0)
+async def split_sentences(text: str):
+    """Yield the sentences of an already complete text."""
+    for sentence in SENTENCE_END.split(text):
+        if sentence.strip():
+            yield sentence.strip()
 
-    async with httpx.AsyncClient(timeout=timeout) as client:
+
+def synthesize_speech(text: str) -> bytes:
+    """Convert text to MP3 bytes with gTTS, in memory."""
+    audio = BytesIO()
+    with timed("tts", "gtts"):
+        gTTS(text=text, lang="en").write_to_fp(audio)
+    return audio.getvalue()
+
+
+async def speak_sentences(sentences):
+    """
+    Convert sentences to MP3 chunks while later sentences are still being generated.
+
+    Parameters:
+    sentences: Async iterator of sentences.
+
+    Yields:
+    bytes: MP3 audio for each sentence, in order.
+    """
+    queue = asyncio.Queue()
+
+    async def collect_sentences():
         try:
-            print(f"--- Sending to Wrapper Summariser: {response[:50]}... ---")
-            response = await client.post(
-                "http://localhost:8787/summarise", json=payload
-            )
-            print(f"--- Received from Wrapper: {response.status_code} ---")
-            response.raise_for_status()
-            data = response.json()
-
-            return data.get("result", "No response from graph.")
-        except httpx.HTTPStatusError as e:
-            print(f"Wrapper Server Error: {e.response.text}")
-            return f"Error from legal graph: {e.response.status_code}"
-        except Exception as e:
-            print(f"Connection Error: {e}")
-            return "Failed to connect to the legal graph server."
+            async for sentence in sentences:
+                await queue.put(sentence)
+        finally:
+            await queue.put(None)
+
+    producer = asyncio.create_task(collect_sentences())
+    try:
+        while (sentence := await queue.get()) is not None:
+            yield await asyncio.to_thread(synthesize_speech, sentence)
+        # Surface summariser errors once the queue is drained
+        await producer
+    finally:
+        producer.cancel()
+
+
+async def prepend_chunk(first_chunk: bytes, chunks):
+    """Yield an already fetched chunk followed by the rest of an async chunk iterator."""
+    if first_chunk:
+        yield first_chunk
+    async for chunk in chunks:
+        yield chunk
+
+
+def busy_exception(error: GraphBusy) -> HTTPException:
+    """Translate an over-capacity graph service into a 429 for the client."""
+    return HTTPException(
+        status_code=429,
+        detail=str(error),
+        headers={"Retry-After": error.retry_after},
+    )
 
 
 # --- API Endpoints ---
@@ -99,38 +336,134 @@ async def analyze_text(
     user_query: str = Form(...),
     thread_id: Optional[str] = Form(None),
     file: Optional[UploadFile] = File(None),
+    stream: bool = Form(False),
+    request_id: Optional[str] = Form(None),
+    deadline_seconds: Optional[float] = Form(None),
 ):
     print(thread_id)
-    current_thread = thread_id or str(uuid.uuid4())
+    # Retries of a first message carry no thread id yet, derive it from the request id so they share a thread
+    current_thread = thread_id or (
+        str(uuid.uuid5(uuid.NAMESPACE_URL, request_id))
+        if request_id
+        else str(uuid.uuid4())
+    )
     file_path = None
 
     if file:
-        file_path = UPLOAD_DIR / f"{uuid.uuid4()}_{file.filename}"
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        file_path = await save_upload(file)
+
+    if stream:
+        return StreamingResponse(
+            stream_graph_logic(
+                user_query,
+                current_thread,
+                str(file_path) if file_path else None,
+                deadline_seconds,
+            ),
+            media_type="application/x-ndjson",
+            headers={"X-Thread-ID": current_thread},
+        )
 
     try:
-        response_text = await run_graph_logic(
-            user_query, current_thread, str(file_path) if file_path else None
+        result = await run_graph_logic(
+            user_query,
+            current_thread,
+            str(file_path) if file_path else None,
+            request_id=request_id,
+            deadline_seconds=deadline_seconds,
         )
+        response_text = result["final_response"]
 
         return JSONResponse(
             {
                 "status": "success",
                 "result": response_text,
                 "thread_id": current_thread,
+                "degradations": result.get("degradations") or [],
             },
             headers={"X-Thread-ID": current_thread},
         )
+    except GraphBusy as e:
+        raise busy_exception(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@api.post("/api/jobs", status_code=202)
+async def submit_analysis_job(
+    user_query: str = Form(...),
+    thread_id: Optional[str] = Form(None),
+    file: Optional[UploadFile] = File(None),
+    deadline_seconds: Optional[float] = Form(None),
+):
+    """
+    Queue a long legal analysis and return a job id to poll with /api/jobs/{job_id}.
+
+    Parameters:
+    user_query (str): The user query.
+    thread_id (Optional[str]): Thread ID to be used.
+    file (Optional[UploadFile]): Document to analyse.
+    deadline_seconds (Optional[float]): Seconds the run may take before it starts skipping optional work.
+
+    Returns:
+    JSONResponse: The job id, thread id and status of the queued job.
+    """
+    current_thread = thread_id or str(uuid.uuid4())
+    file_path = None
+
+    if file:
+        file_path = await save_upload(file)
+
+    payload = {
+        "query": user_query,
+        "thread_id": current_thread,
+        "doc_path": str(file_path) if file_path else None,
+        "deadline_seconds": deadline_seconds,
+    }
+    try:
+        job = await graph_transport.submit_job(payload)
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+
+    return JSONResponse(job, status_code=202, headers={"X-Thread-ID": current_thread})
+
+
+@api.get("/api/jobs/{job_id}")
+async def get_analysis_job(job_id: str):
+    """
+    Poll a queued legal analysis.
+
+    Parameters:
+    job_id (str): The id returned by /api/jobs.
+
+    Returns:
+    JSONResponse: The job status, and the analysis once it has completed.
+    """
+    try:
+        job = await graph_transport.get_job(job_id)
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+
+    result = job.get("result") or {}
+    return JSONResponse(
+        {
+            "job_id": job["job_id"],
+            "status": job["status"],
+            "thread_id": job["thread_id"],
+            "result": result.get("result", {}).get("final_response"),
+            "degradations": result.get("result", {}).get("degradations") or [],
+            "error": job.get("error"),
+        },
+        headers={"X-Thread-ID": job["thread_id"]},
+    )
+
+
 @api.post("/api/voice")
 async def analyze_voice(
     audio_file: UploadFile = File(...),
     thread_id: Optional[str] = Form(None),
     file: Optional[UploadFile] = File(None),
+    deadline_seconds: Optional[float] = Form(None),
 ):
     """
     Analyze voice from audio file.
@@ -139,60 +472,83 @@ async def analyze_voice(
     audio_file (UploadFile): Audio file to be analyzed.
     thread_id (Optional[str]): Thread ID to be used.
     file (Optional[UploadFile]): File to be used.
+    deadline_seconds (Optional[float]): Seconds the graph run may take before it starts skipping optional work.
 
     Returns:
-    JSONResponse: A JSON response containing the thread ID, AI text, and audio file as base64.
+    StreamingResponse: The spoken summary as an audio/mpeg stream, with the degradations applied in the
+    X-Degradations header. The full analysis is served by /api/voice/{thread_id}/result.
     """
     current_thread = thread_id or str(uuid.uuid4())
 
-    temp_audio_name = f"audio_{uuid.uuid4()}.wav"
-    with open("./input_audio/" + temp_audio_name, "wb") as buffer:
-        shutil.copyfileobj(audio_file.file, buffer)
-
     try:
-        print("GROQ REQUEST")
-        transcription = ""
-        with open("./input_audio/" + temp_audio_name, "rb") as audio:
-            transcription = client.audio.transcriptions.create(
-                file=("./input_audio/" + temp_audio_name, audio.read()),
-                model="whisper-large-v3",
-                response_format="verbose_json",
-            )
-        print("GROQ RESPONSE")
-        user_text = transcription.text
+        audio_bytes = await audio_file.read()
+        user_text = await transcribe_audio(
+            audio_file.filename or "audio.wav", audio_bytes
+        )
         print("user text : ", user_text)
 
         file_path = None
         if file:
-            file_path = UPLOAD_DIR / f"{uuid.uuid4()}_{file.filename}"
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-
-        ai_response_text = await run_graph_logic(
-            user_text, current_thread, str(file_path) if file_path else None
+            file_path = await save_upload(file)
+
+        result = await run_graph_logic(
+            user_text,
+            current_thread,
+            str(file_path) if file_path else None,
+            priority="voice",
+            deadline_seconds=deadline_seconds,
         )
-
-        # Summarise and Voice output
-        short_response = await summarise_response(user_text, ai_response_text)
-        tts = gTTS(text=short_response, lang="en")
-        tts.save("./output_audio/" + temp_audio_name)
+        ai_response_text = result["final_response"]
+
+        # Voice output, one sentence at a time. The graph already returns a spoken summary;
+        # only fall back to the streaming summariser when it does not (e.g. errors, older wrapper).
+        if result.get("voice_summary"):
+            sentences = split_sentences(result["voice_summary"])
+        else:
+            sentences = stream_summary_sentences(user_text, ai_response_text)
+        audio_chunks = speak_sentences(sentences)
+
+        # Pull the first sentence before responding so failures still surface as a 500
+        first_chunk = await anext(audio_chunks, b"")
         print("GTTS SUCCESS")
-        with open("./output_audio/" + temp_audio_name, "rb") as f:
-            audio_b64 = base64.b64encode(f.read()).decode("ascii")
 
-        return JSONResponse(
-            {
-                "thread_id": current_thread,
-                "ai_text": ai_response_text,
-                "audio_base64": audio_b64,
+        return StreamingResponse(
+            prepend_chunk(first_chunk, audio_chunks),
+            media_type="audio/mpeg",
+            headers={
+                "X-Thread-ID": current_thread,
+                "X-Degradations": ",".join(result.get("degradations") or []),
             },
-            headers={"X-Thread-ID": current_thread},
         )
+    except GraphBusy as e:
+        raise busy_exception(e)
     except Exception as e:
         print(e)
-        if os.path.exists("./input_audio/" + temp_audio_name):
-            os.remove("./input_audio/" + temp_audio_name)
-        if os.path.exists("./output_audio/" + temp_audio_name):
-            os.remove("./output_audio/" + temp_audio_name)
         print("Error over groq or llm")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@api.get("/api/voice/{thread_id}/result")
+async def get_voice_result(thread_id: str):
+    """
+    Fetch the full analysis behind the latest voice reply of a thread.
+    It is read from the thread's graph checkpoint, so any worker can serve it, also after a restart.
+
+    Parameters:
+    thread_id (str): The thread id returned in the X-Thread-ID header of /api/voice.
+
+    Returns:
+    JSONResponse: The thread id, the full analysis and the degradations applied.
+    """
+    try:
+        data = await graph_transport.get_thread_result(thread_id)
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+
+    return JSONResponse(
+        {
+            "thread_id": thread_id,
+            "result": data["result"]["final_response"],
+            "degradations": data["result"].get("degradations") or [],
+        }
+    )
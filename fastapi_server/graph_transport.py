@@ -0,0 +1,172 @@
+#
+# Transport between the API server and the legal graph
+#
+
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Optional
+
+import httpx
+
+GRAPH_DIR = Path(__file__).resolve().parent.parent / "langgraph_legal_ai"
+
+
+class GraphBusy(Exception):
+    """Raised when the legal graph service is over capacity and asks the caller to retry later."""
+
+    def __init__(self, detail: str, retry_after: str):
+        super().__init__(detail)
+        self.retry_after = retry_after
+
+
+def raise_for_status(response: httpx.Response):
+    """Raise GraphBusy for 429 responses and httpx.HTTPStatusError for other errors."""
+    if response.status_code == 429:
+        raise GraphBusy("Legal graph is busy", response.headers.get("Retry-After", "5"))
+    response.raise_for_status()
+
+
+class HttpGraphTransport:
+    """
+    Calls the legal graph wrapper over HTTP using one pooled keep-alive client for the lifetime of the app.
+    """
+
+    def __init__(self, base_url: str):
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=httpx.Timeout(120.0, connect=60.0),
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        )
+
+    async def run_graph(self, payload: dict) -> dict:
+        response = await self.client.post("/run-legal-graph", json=payload)
+        raise_for_status(response)
+        return response.json()
+
+    async def stream_graph(self, payload: dict):
+        # No read timeout: tokens keep arriving for as long as the graph runs
+        async with self.client.stream(
+            "POST",
+            "/run-legal-graph/stream",
+            json=payload,
+            timeout=httpx.Timeout(None, connect=60.0),
+        ) as response:
+            raise_for_status(response)
+            async for line in response.aiter_lines():
+                if line:
+                    yield line
+
+    async def summarise(self, payload: dict) -> dict:
+        response = await self.client.post("/summarise", json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    async def stream_summary(self, payload: dict):
+        async with self.client.stream(
+            "POST", "/summarise/stream", json=payload
+        ) as response:
+            response.raise_for_status()
+            async for text in response.aiter_text():
+                yield text
+
+    async def submit_job(self, payload: dict) -> dict:
+        response = await self.client.post("/jobs", json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    async def get_job(self, job_id: str) -> dict:
+        response = await self.client.get(f"/jobs/{job_id}")
+        response.raise_for_status()
+        return response.json()
+
+    async def get_thread_result(self, thread_id: str) -> dict:
+        response = await self.client.get(f"/threads/{thread_id}/result")
+        response.raise_for_status()
+        return response.json()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+class InProcessGraphTransport:
+    """
+    Runs the legal graph and summariser inside this process, skipping HTTP and the JSON round-trip of the graph state.
+    """
+
+    def __init__(self):
+        if str(GRAPH_DIR) not in sys.path:
+            sys.path.insert(0, str(GRAPH_DIR))
+
+        import legal_agent_wrapper
+
+        self.wrapper = legal_agent_wrapper
+
+    async def run_graph(self, payload: dict) -> dict:
+        try:
+            return await self.wrapper.execute_graph(
+                self.wrapper.GraphRequest(**payload)
+            )
+        except self.wrapper.AdmissionRejected as e:
+            raise GraphBusy(str(e), str(e.retry_after))
+
+    async def stream_graph(self, payload: dict):
+        request = self.wrapper.GraphRequest(**payload)
+        try:
+            events = await self.wrapper.open_graph_stream(request, payload["thread_id"])
+        except self.wrapper.AdmissionRejected as e:
+            raise GraphBusy(str(e), str(e.retry_after))
+
+        async for line in events:
+            yield line.rstrip("\n")
+
+    async def summarise(self, payload: dict) -> dict:
+        return await self.wrapper.execute_summary(
+            self.wrapper.SummariseRequest(**payload)
+        )
+
+    async def stream_summary(self, payload: dict):
+        request = self.wrapper.SummariseRequest(**payload)
+        async for text in self.wrapper.stream_summary(request):
+            yield text
+
+    async def submit_job(self, payload: dict) -> dict:
+        return await self.wrapper.submit_job(self.wrapper.GraphRequest(**payload))
+
+    async def get_job(self, job_id: str) -> dict:
+        return self.wrapper.lookup_job(job_id)
+
+    async def get_thread_result(self, thread_id: str) -> dict:
+        return await self.wrapper.read_thread_result(thread_id)
+
+    async def aclose(self):
+        await self.wrapper.job_queue.stop()
+        await self.wrapper.close_app()
+
+
+def create_graph_transport(kind: Optional[str] = None):
+    """
+    Create the transport selected by the GRAPH_TRANSPORT setting.
+    "http" talks to the legal_agent_wrapper service, "inprocess" runs the graph inside this server.
+
+    Parameters:
+    kind (Optional[str]): Either "http" or "inprocess". Defaults to the GRAPH_TRANSPORT env var, then "http".
+
+    Returns:
+    HttpGraphTransport | InProcessGraphTransport: The transport used to reach the legal graph.
+    """
+    kind = kind or os.getenv("GRAPH_TRANSPORT", "http")
+
+    if kind == "inprocess":
+        return InProcessGraphTransport()
+    if kind == "http":
+        return HttpGraphTransport(
+            os.getenv("GRAPH_SERVICE_URL", "http://localhost:8787")
+        )
+    raise ValueError(f"Unknown GRAPH_TRANSPORT: {kind}")
+
+
+def error_event(detail: str) -> str:
+    """Build an NDJSON error event line."""
+    return json.dumps({"event": "error", "detail": detail})
@@ -0,0 +1,150 @@
+#
+# Admission control for graph runs
+#
+
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import asynccontextmanager
+from typing import Optional
+
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", "8"))
+ADMISSION_MAX_QUEUED = int(os.getenv("ADMISSION_MAX_QUEUED", "32"))
+ADMISSION_MAX_PER_THREAD = int(os.getenv("ADMISSION_MAX_PER_THREAD", "1"))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "5"))
+
+# Lower value is served first
+LANE_PRIORITY = {"voice": 0, "text": 1}
+
+
+class AdmissionRejected(Exception):
+    """Raised when a graph run cannot be admitted right now."""
+
+    def __init__(self, reason: str, retry_after: int = ADMISSION_RETRY_AFTER):
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Limits how many graph runs execute at once.
+
+    Runs that cannot start immediately wait in a priority queue (voice before text). Once the
+    queue is full, new runs are rejected so the caller can answer 429 instead of piling up.
+    Each thread_id may only have `max_per_thread` runs admitted or waiting at a time; further runs
+    of the thread are rejected, or, for background jobs, queued until the thread's run finishes.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = ADMISSION_MAX_CONCURRENT,
+        max_queued: int = ADMISSION_MAX_QUEUED,
+        max_per_thread: int = ADMISSION_MAX_PER_THREAD,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.max_per_thread = max_per_thread
+        self.active = 0
+        self.waiters = []
+        self.sequence = itertools.count()
+        self.per_thread = Counter()
+        # Background runs waiting for their thread's run in flight to finish
+        self.thread_waiters = defaultdict(list)
+        self.admitted = 0
+        self.rejected = 0
+        self.wait_times = deque(maxlen=500)
+
+    @asynccontextmanager
+    async def admit(
+        self, lane: str = "text", thread_id: Optional[str] = None, wait: bool = False
+    ):
+        """
+        Hold a run slot for the duration of the block.
+
+        Parameters:
+        lane (str): "voice" or "text". Voice runs are admitted ahead of queued text runs.
+        thread_id (Optional[str]): The conversation thread of the run.
+        wait (bool): Queue behind the thread's run in flight and even when the queue is full, instead of rejecting (used by background jobs).
+
+        Raises:
+        AdmissionRejected: If, without `wait`, the thread already has a run in flight or the service is over capacity.
+        """
+        started = time.monotonic()
+        if thread_id and self.per_thread[thread_id] >= self.max_per_thread:
+            if not wait:
+                self.rejected += 1
+                raise AdmissionRejected(
+                    f"Thread {thread_id} already has a run in progress"
+                )
+            while self.per_thread[thread_id] >= self.max_per_thread:
+                waiter = asyncio.get_running_loop().create_future()
+                self.thread_waiters[thread_id].append(waiter)
+                await waiter
+
+        if thread_id:
+            self.per_thread[thread_id] += 1
+        try:
+            await self._acquire(LANE_PRIORITY.get(lane, LANE_PRIORITY["text"]), wait)
+            self.admitted += 1
+            self.wait_times.append(time.monotonic() - started)
+            try:
+                yield
+            finally:
+                self._release()
+        finally:
+            if thread_id:
+                self.per_thread[thread_id] -= 1
+                if not self.per_thread[thread_id]:
+                    del self.per_thread[thread_id]
+                # Let the runs queued behind this one compete for the thread again
+                for waiter in self.thread_waiters.pop(thread_id, []):
+                    if not waiter.done():
+                        waiter.set_result(None)
+
+    def queued(self) -> int:
+        return sum(1 for _, _, waiter in self.waiters if not waiter.done())
+
+    def metrics(self) -> dict:
+        """Current load, queue length and wait-time statistics."""
+        waits = list(self.wait_times)
+        return {
+            "active": self.active,
+            "max_concurrent": self.max_concurrent,
+            "queued": self.queued(),
+            "max_queued": self.max_queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_wait_seconds": round(sum(waits) / len(waits), 3) if waits else 0.0,
+            "max_wait_seconds": round(max(waits), 3) if waits else 0.0,
+        }
+
+    async def _acquire(self, priority: int, wait: bool):
+        if self.active < self.max_concurrent and not self.queued():
+            self.active += 1
+            return
+
+        if not wait and self.queued() >= self.max_queued:
+            self.rejected += 1
+            raise AdmissionRejected("Legal graph is at capacity")
+
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (priority, next(self.sequence), waiter))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # The slot may have been handed over just before the cancellation
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            raise
+
+    def _release(self):
+        # Hand the slot straight to the highest-priority waiter, if any
+        while self.waiters:
+            _, _, waiter = heapq.heappop(self.waiters)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
@@ -1,3 +1,3 @@
 from legal_modules.chain_summariser import chain
-from legal_modules.graph_builder import app
+from legal_modules.graph_builder import close_app, get_app
 from legal_modules.setup import langfuse_handler
@@ -0,0 +1,145 @@
+#
+# Background job queue for long legal analyses
+#
+
+import asyncio
+import os
+import time
+import uuid
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", "3600"))
+
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+class JobQueue:
+    """
+    A bounded queue of graph runs served by a fixed pool of async workers.
+
+    Finished jobs are kept for `ttl_seconds` so clients can poll for the result.
+    """
+
+    def __init__(
+        self,
+        runner: Callable[[object], Awaitable[dict]],
+        workers: int = JOB_WORKERS,
+        max_queued: int = JOB_QUEUE_SIZE,
+        ttl_seconds: int = JOB_TTL_SECONDS,
+    ):
+        self.runner = runner
+        self.worker_count = workers
+        self.ttl_seconds = ttl_seconds
+        self.queue: Optional[asyncio.Queue] = None
+        self.max_queued = max_queued
+        self.jobs = {}
+        self.workers = []
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.wait_times = deque(maxlen=500)
+
+    def start(self):
+        """Start the worker pool. Safe to call more than once."""
+        if self.workers:
+            return
+        self.queue = asyncio.Queue(maxsize=self.max_queued)
+        self.workers = [
+            asyncio.create_task(self._worker()) for _ in range(self.worker_count)
+        ]
+
+    async def stop(self):
+        """Cancel the worker pool."""
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    def submit(self, payload, thread_id: str) -> dict:
+        """
+        Queue a graph run.
+
+        Parameters:
+        payload: The request to hand to the runner.
+        thread_id (str): The thread id the run checkpoints under.
+
+        Returns:
+        dict: The job record.
+
+        Raises:
+        JobQueueFull: If the queue is at capacity.
+        """
+        self.start()
+        self._evict_expired()
+
+        job = {
+            "job_id": str(uuid.uuid4()),
+            "thread_id": thread_id,
+            "status": "queued",
+            "submitted_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+        }
+        try:
+            self.queue.put_nowait((job, payload))
+        except asyncio.QueueFull:
+            raise JobQueueFull(f"Job queue is full ({self.max_queued} queued)")
+
+        self.jobs[job["job_id"]] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """Return the job record, or None if it is unknown or expired."""
+        return self.jobs.get(job_id)
+
+    def metrics(self) -> dict:
+        """Queue depth, worker utilisation and wait-time statistics."""
+        waits = list(self.wait_times)
+        return {
+            "queue_depth": self.queue.qsize() if self.queue else 0,
+            "queue_capacity": self.max_queued,
+            "workers": self.worker_count,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_wait_seconds": round(sum(waits) / len(waits), 3) if waits else 0.0,
+            "max_wait_seconds": round(max(waits), 3) if waits else 0.0,
+        }
+
+    async def _worker(self):
+        while True:
+            job, payload = await self.queue.get()
+            job["status"] = "running"
+            job["started_at"] = time.time()
+            self.wait_times.append(job["started_at"] - job["submitted_at"])
+            self.running += 1
+            try:
+                job["result"] = await self.runner(payload)
+                job["status"] = "completed"
+                self.completed += 1
+            except Exception as e:
+                print(f"Job {job['job_id']} failed: {e}")
+                job["status"] = "failed"
+                job["error"] = str(e)
+                self.failed += 1
+            finally:
+                job["finished_at"] = time.time()
+                self.running -= 1
+                self.queue.task_done()
+
+    def _evict_expired(self):
+        cutoff = time.time() - self.ttl_seconds
+        expired = [
+            job_id
+            for job_id, job in self.jobs.items()
+            if job["finished_at"] and job["finished_at"] < cutoff
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
@@ -1,18 +1,85 @@
+import asyncio
+import json
 import uuid
-from typing import Optional
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import List, Literal, Optional
 
 import uvicorn
-from core_graph import app, chain, langfuse_handler
-from fastapi import Body, FastAPI
+from admission import AdmissionController, AdmissionRejected
+from core_graph import chain, close_app, get_app, langfuse_handler
+from fastapi import Body, FastAPI, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from job_queue import JobQueue, JobQueueFull
+from legal_modules.answer_cache import answer_cache
+from legal_modules.deadline import deadline_from_now
+from legal_modules.governor import llm_governor
+from legal_modules.metrics import llm_metrics
+from legal_modules.setup import attempt_stats, llm_cache
+from legal_modules.speculation import speculation_stats
+from legal_modules.timing import (
+    collect_request_timings,
+    summarise_request_timings,
+    timings,
+)
+from legal_modules.utils import file_content_hash
 from pydantic import BaseModel
+from single_flight import SingleFlight
 
-api = FastAPI()
+# Node whose LLM tokens are forwarded to streaming clients
+STREAMED_TOKEN_NODE = "synthesize_verdict"
+
+# State fields returned when the caller does not ask for specific ones. Pass ["*"] for the whole state.
+# build_graph_run resets them per run, so a run that does not write one returns no stale value.
+DEFAULT_RESULT_FIELDS = [
+    "final_response",
+    "voice_summary",
+    "citations",
+    "consistency_score",
+    "degradations",
+]
+
+
+@asynccontextmanager
+async def lifespan(api: FastAPI):
+    # Compile the graph and open the async checkpointer before serving requests
+    await get_app()
+    yield
+    await job_queue.stop()
+    await close_app()
+
+
+api = FastAPI(lifespan=lifespan)
+
+# Global limit on concurrent graph runs, with a priority lane for voice requests
+admission = AdmissionController()
+
+# Identical requests (double submits, client retries) share one graph run
+single_flight = SingleFlight()
+
+
+@api.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request, exc: AdmissionRejected):
+    return JSONResponse(
+        {"status": "error", "detail": str(exc)},
+        status_code=429,
+        headers={"Retry-After": str(exc.retry_after)},
+    )
 
 
 class GraphRequest(BaseModel):
     query: str
     doc_path: Optional[str] = None
     thread_id: Optional[str] = None
+    fields: Optional[List[str]] = None
+    priority: Literal["voice", "text"] = "text"
+    request_id: Optional[str] = None
+    bypass_cache: bool = False
+    # Return per-node, LLM, Chroma and embedding timings of the run
+    debug: bool = False
+    # Seconds the run may take before nodes start skipping optional work, GRAPH_DEADLINE_SECONDS by default
+    deadline_seconds: Optional[float] = None
 
 
 class SummariseRequest(BaseModel):
@@ -20,44 +87,317 @@ class SummariseRequest(BaseModel):
     response: str
 
 
-@api.post("/run-legal-graph")
-def run_legal_graph(payload: GraphRequest):
+def build_graph_run(payload: GraphRequest, thread_id: str):
     """
-    Run the legal graph with the given query and optional document path.
+    Build the graph input and run config for a request.
 
     Parameters:
-    payload (GraphRequest): A GraphRequest object containing the query and optional document path.
+    payload (GraphRequest): The incoming graph request.
+    thread_id (str): The thread id used for checkpointing.
 
     Returns:
-    dict: A dictionary containing the status, thread_id, and result of running the legal graph.
+    tuple: The graph input dictionary and the run config.
     """
-    thread_id = payload.thread_id or str(uuid.uuid4())
-
     graph_input = {
         "input_query": payload.query,
+        "bypass_answer_cache": payload.bypass_cache,
+        "want_voice_summary": payload.priority == "voice",
+        "degradations": None,
+        # The thread's checkpoint still holds the previous turn's answer; paths that end before
+        # finalize (e.g. a question that is not legal) must not return it as this turn's
+        "final_response": None,
+        "voice_summary": None,
+        "citations": [],
+        "consistency_score": None,
     }
 
     if payload.doc_path:
         print(payload.doc_path)
         graph_input["document_path"] = payload.doc_path
 
-    result = app.invoke(
-        graph_input,
-        config={
-            "configurable": {"thread_id": thread_id},
-            "callbacks": [langfuse_handler],
+    config = {
+        "configurable": {
+            "thread_id": thread_id,
+            "deadline": deadline_from_now(payload.deadline_seconds),
         },
+        "callbacks": [langfuse_handler],
+    }
+    return graph_input, config
+
+
+def project_result(result: dict, fields: Optional[List[str]] = None) -> dict:
+    """
+    Keep only the requested fields of the final graph state.
+
+    Parameters:
+    result (dict): The final graph state.
+    fields (Optional[List[str]]): The state fields to keep. ["*"] keeps everything, None keeps DEFAULT_RESULT_FIELDS.
+
+    Returns:
+    dict: The projected result.
+    """
+    fields = fields or DEFAULT_RESULT_FIELDS
+    if "*" in fields:
+        return result
+    return {field: result.get(field) for field in fields}
+
+
+def compact_json_response(content: dict, **kwargs) -> Response:
+    """
+    Serialise a response with compact separators, only falling back to FastAPI's encoder for
+    values json cannot handle (Documents, messages), instead of walking the whole payload.
+
+    Parameters:
+    content (dict): The response body.
+
+    Returns:
+    Response: The JSON response.
+    """
+    body = json.dumps(
+        content, separators=(",", ":"), ensure_ascii=False, default=jsonable_encoder
     )
+    return Response(content=body, media_type="application/json", **kwargs)
 
-    return {
+
+async def execute_graph(payload: GraphRequest, wait_for_slot: bool = False) -> dict:
+    """
+    Run the legal graph for a request. Shared by the HTTP endpoint and in-process callers.
+
+    Requests for the same thread, query, document, fields and priority that arrive while a run is in
+    flight share that run, and a request_id seen before returns its remembered result.
+
+    Parameters:
+    payload (GraphRequest): A GraphRequest object containing the query and optional document path.
+    wait_for_slot (bool): Wait for capacity instead of failing fast when the service is saturated.
+
+    Returns:
+    dict: A dictionary containing the status, thread_id, and result of running the legal graph.
+
+    Raises:
+    AdmissionRejected: If the run cannot be admitted.
+    """
+    thread_id = payload.thread_id or str(uuid.uuid4())
+    document_hash = (
+        await asyncio.to_thread(file_content_hash, payload.doc_path)
+        if payload.doc_path
+        else None
+    )
+    key = (
+        thread_id,
+        payload.query,
+        document_hash,
+        tuple(payload.fields or ()),
+        payload.debug,
+        payload.priority,
+    )
+
+    return await single_flight.run(
+        key,
+        partial(run_graph_once, payload, thread_id, wait_for_slot),
+        request_id=payload.request_id,
+    )
+
+
+async def run_graph_once(
+    payload: GraphRequest, thread_id: str, wait_for_slot: bool
+) -> dict:
+    """
+    Admit and execute a single graph run.
+
+    Parameters:
+    payload (GraphRequest): A GraphRequest object containing the query and optional document path.
+    thread_id (str): The thread id used for checkpointing.
+    wait_for_slot (bool): Wait for capacity instead of failing fast when the service is saturated.
+
+    Returns:
+    dict: A dictionary containing the status, thread_id, and result of running the legal graph.
+    """
+    graph_input, config = build_graph_run(payload, thread_id)
+    entries = collect_request_timings()
+
+    app = await get_app()
+    async with admission.admit(payload.priority, thread_id, wait=wait_for_slot):
+        result = await app.ainvoke(graph_input, config=config)
+
+    response = {
         "status": "success",
         "thread_id": thread_id,
+        "result": project_result(result, payload.fields),
+    }
+    if payload.debug:
+        response["debug"] = summarise_request_timings(entries)
+    return response
+
+
+# Long analyses are submitted here and polled for instead of holding an HTTP request open
+job_queue = JobQueue(runner=partial(execute_graph, wait_for_slot=True))
+
+
+@api.post("/run-legal-graph")
+async def run_legal_graph(payload: GraphRequest):
+    """
+    Run the legal graph with the given query and optional document path.
+
+    Parameters:
+    payload (GraphRequest): A GraphRequest object containing the query and optional document path.
+
+    Returns:
+    dict: A dictionary containing the status, thread_id, and result of running the legal graph.
+    """
+    return compact_json_response(await execute_graph(payload))
+
+
+async def stream_graph_events(payload: GraphRequest, thread_id: str):
+    """
+    Run the legal graph and yield NDJSON events as it progresses.
+
+    Emits a `start` event, a `node` event whenever a node completes, `token` events for the
+    verdict as it is generated and a closing `final` event with the final response.
+
+    Parameters:
+    payload (GraphRequest): A GraphRequest object containing the query and optional document path.
+    thread_id (str): The thread id of the run.
+
+    Yields:
+    str: One JSON encoded event per line.
+    """
+    graph_input, config = build_graph_run(payload, thread_id)
+    entries = collect_request_timings()
+    yield json.dumps({"event": "start", "thread_id": thread_id}) + "\n"
+
+    final = {}
+    degradations = []
+    try:
+        app = await get_app()
+        async for mode, chunk in app.astream(
+            graph_input, config=config, stream_mode=["updates", "messages"]
+        ):
+            if mode == "updates":
+                for node_name, update in chunk.items():
+                    if isinstance(update, dict):
+                        for field in ("final_response", "voice_summary"):
+                            if update.get(field):
+                                final[field] = update[field]
+                        for degradation in update.get("degradations") or []:
+                            if degradation not in degradations:
+                                degradations.append(degradation)
+                    yield json.dumps({"event": "node", "node": node_name}) + "\n"
+            else:
+                message, metadata = chunk
+                if (
+                    metadata.get("langgraph_node") == STREAMED_TOKEN_NODE
+                    and isinstance(message.content, str)
+                    and message.content
+                ):
+                    yield json.dumps(
+                        {"event": "token", "content": message.content}
+                    ) + "\n"
+    except Exception as e:
+        print(f"Streaming run failed: {e}")
+        yield json.dumps({"event": "error", "detail": str(e)}) + "\n"
+        return
+
+    event = {
+        "event": "final",
+        "thread_id": thread_id,
+        "final_response": final.get("final_response", "No response from graph."),
+        "voice_summary": final.get("voice_summary"),
+        "degradations": degradations,
+    }
+    if payload.debug:
+        event["debug"] = summarise_request_timings(entries)
+    yield json.dumps(event) + "\n"
+
+
+async def open_graph_stream(payload: GraphRequest, thread_id: str):
+    """
+    Admit a streaming graph run and return its event stream. The run slot is held until the stream is closed.
+
+    The slot is taken inside the stream, which is advanced up to admission before returning, so a
+    rejection still raises here while the slot belongs to a started generator: it is released when
+    the stream finishes, is closed, or is collected without ever being sent.
+
+    Parameters:
+    payload (GraphRequest): A GraphRequest object containing the query and optional document path.
+    thread_id (str): The thread id of the run.
+
+    Returns:
+    AsyncIterator[str]: The NDJSON event stream.
+
+    Raises:
+    AdmissionRejected: If the run cannot be admitted.
+    """
+
+    async def events():
+        async with admission.admit(payload.priority, thread_id):
+            # Marks admission, consumed below before the stream is handed out
+            yield None
+            async for line in stream_graph_events(payload, thread_id):
+                yield line
+
+    stream = events()
+    await anext(stream)
+    return stream
+
+
+@api.post("/run-legal-graph/stream")
+async def run_legal_graph_stream(payload: GraphRequest):
+    """
+    Run the legal graph and stream its progress as newline-delimited JSON.
+
+    Parameters:
+    payload (GraphRequest): A GraphRequest object containing the query and optional document path.
+
+    Returns:
+    StreamingResponse: An NDJSON stream of node completion, token and final events.
+    """
+    thread_id = payload.thread_id or str(uuid.uuid4())
+
+    return StreamingResponse(
+        await open_graph_stream(payload, thread_id),
+        media_type="application/x-ndjson",
+        headers={"X-Thread-ID": thread_id},
+    )
+
+
+async def execute_summary(request: SummariseRequest) -> dict:
+    """
+    Summarise the legal analysis of a user query. Shared by the HTTP endpoint and in-process callers.
+
+    Parameters:
+    request (SummariseRequest): A SummariseRequest object containing the user query and legal analysis.
+
+    Returns:
+    dict: A dictionary containing the status and result of summarising the legal analysis.
+    """
+    chain_input = {"user_query": request.query, "legal_analysis": request.response}
+
+    result = await chain.ainvoke(chain_input)
+
+    return {
+        "status": "success",
         "result": result,
     }
 
 
+async def stream_summary(request: SummariseRequest):
+    """
+    Stream the summary of a legal analysis as it is generated.
+
+    Parameters:
+    request (SummariseRequest): A SummariseRequest object containing the user query and legal analysis.
+
+    Yields:
+    str: Summary text chunks.
+    """
+    chain_input = {"user_query": request.query, "legal_analysis": request.response}
+
+    async for chunk in chain.astream(chain_input):
+        yield chunk
+
+
 @api.post("/summarise")
-def summarise(request: SummariseRequest):
+async def summarise(request: SummariseRequest):
     """
     Summarise the legal analysis of a user query.
 
@@ -67,11 +407,141 @@ def summarise(request: SummariseRequest):
     Returns:
     dict: A dictionary containing the status and result of summarising the legal analysis.
     """
-    chain_input = {"user_query": request.query, "legal_analysis": request.response}
+    return await execute_summary(request)
+
+
+@api.post("/jobs", status_code=202)
+async def submit_job(payload: GraphRequest):
+    """
+    Queue a legal graph run and return immediately with a job id to poll.
+
+    Parameters:
+    payload (GraphRequest): A GraphRequest object containing the query and optional document path.
+
+    Returns:
+    dict: The job id, thread id and status of the queued job.
+    """
+    # Fix the thread id up front so the result lands in the same checkpoint thread
+    payload.thread_id = payload.thread_id or str(uuid.uuid4())
+
+    try:
+        job = job_queue.submit(payload, payload.thread_id)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    return {
+        "status": job["status"],
+        "job_id": job["job_id"],
+        "thread_id": job["thread_id"],
+    }
+
+
+def lookup_job(job_id: str) -> dict:
+    """
+    Return a job record or raise a 404 if the job is unknown or has expired.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job id")
+    return job
+
+
+@api.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Poll the state of a queued legal graph run.
+
+    Parameters:
+    job_id (str): The id returned by /jobs.
+
+    Returns:
+    Response: The job record, including the graph result once completed.
+    """
+    return compact_json_response(lookup_job(job_id))
+
+
+async def read_thread_result(thread_id: str) -> dict:
+    """
+    Return the result of the latest completed run of a thread, read from its checkpoint.
 
-    result = chain.invoke(chain_input)
+    Parameters:
+    thread_id (str): The thread id of the run.
+
+    Returns:
+    dict: A dictionary containing the status, thread_id, and projected result of the run.
+
+    Raises:
+    HTTPException: 404 if the thread has no completed run.
+    """
+    app = await get_app()
+    snapshot = await app.aget_state({"configurable": {"thread_id": thread_id}})
+    if not snapshot.values.get("final_response"):
+        raise HTTPException(status_code=404, detail="No result for this thread")
 
     return {
         "status": "success",
-        "result": result,
+        "thread_id": thread_id,
+        "result": project_result(snapshot.values),
+    }
+
+
+@api.get("/threads/{thread_id}/result")
+async def get_thread_result(thread_id: str):
+    """
+    Fetch the result of the latest completed run of a thread.
+
+    Parameters:
+    thread_id (str): The thread id of the run.
+
+    Returns:
+    Response: The status, thread id and projected result of the run.
+    """
+    return compact_json_response(await read_thread_result(thread_id))
+
+
+@api.get("/stats")
+async def stats():
+    """
+    Runtime statistics of the wrapper service.
+
+    Returns:
+    dict: Job queue and admission queue depth, worker usage and wait times, cache hit rates and per-node LLM latency and tokens.
+    """
+    return {
+        "jobs": job_queue.metrics(),
+        "admission": admission.metrics(),
+        "single_flight": single_flight.metrics(),
+        "answer_cache": answer_cache.metrics(),
+        "llm_cache": llm_cache.metrics(),
+        "llm_nodes": llm_metrics.metrics(),
+        "llm_attempts": attempt_stats.metrics(),
+        "llm_governor": llm_governor.metrics(),
+        "speculative_retrieval": speculation_stats.metrics(),
     }
+
+
+@api.get("/metrics")
+async def metrics():
+    """
+    Latency histograms, error counts and LLM token counts in the Prometheus text format.
+
+    Returns:
+    Response: The metrics as text/plain.
+    """
+    return Response(
+        content=timings.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@api.post("/summarise/stream")
+async def summarise_stream(request: SummariseRequest):
+    """
+    Summarise the legal analysis of a user query, streaming the text as it is generated.
+
+    Parameters:
+    request (SummariseRequest): A SummariseRequest object containing the user query and legal analysis.
+
+    Returns:
+    StreamingResponse: The summary as a plain text stream.
+    """
+    return StreamingResponse(stream_summary(request), media_type="text/plain")
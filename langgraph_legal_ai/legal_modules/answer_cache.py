@@ -0,0 +1,131 @@
+#
+# Semantic Whole-Answer Cache
+#
+
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", "86400"))
+ANSWER_CACHE_MAX = int(os.getenv("ANSWER_CACHE_MAX", "512"))
+
+
+class SemanticAnswerCache:
+    """
+    Caches synthesized verdicts by the embedding of the optimised query.
+
+    A lookup hits when an unexpired entry has the same intent, document and corpus version
+    and its query embedding has cosine similarity >= `threshold`. Least recently used
+    entries are evicted beyond `max_entries`. Lookups and stores run in worker threads, so the
+    entries are only touched under `lock`.
+    """
+
+    def __init__(
+        self,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+        ttl_seconds: int = ANSWER_CACHE_TTL,
+        max_entries: int = ANSWER_CACHE_MAX,
+    ):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(
+        self,
+        embedding: List[float],
+        intent: str,
+        document_key: Optional[str],
+        corpus_version: str,
+    ) -> Optional[dict]:
+        """
+        Find the closest cached answer for the query.
+
+        Parameters:
+        embedding (List[float]): Embedding of the optimised query.
+        intent (str): The classified intent.
+        document_key (Optional[str]): Content-addressed id of the user document, if any.
+        corpus_version (str): Version of the legal knowledge base.
+
+        Returns:
+        Optional[dict]: The cached entry with `draft_verdict`, `citations` and `consistency_score`, or None.
+        """
+        now = time.monotonic()
+        query = self._normalise(embedding)
+        best_id, best_score = None, self.threshold
+
+        with self.lock:
+            for entry_id, entry in list(self.entries.items()):
+                if entry["expires"] < now:
+                    self.entries.pop(entry_id, None)
+                    continue
+                if (
+                    entry["intent"],
+                    entry["document_key"],
+                    entry["corpus_version"],
+                ) != (intent, document_key, corpus_version):
+                    continue
+                score = float(np.dot(query, entry["vector"]))
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.entries.move_to_end(best_id)
+            return self.entries[best_id]
+
+    def store(
+        self,
+        embedding: List[float],
+        intent: str,
+        document_key: Optional[str],
+        corpus_version: str,
+        draft_verdict: str,
+        citations: list,
+        consistency_score: Optional[float] = None,
+    ):
+        """Cache a verdict, its citations and its audit score for the query."""
+        entry = {
+            "vector": self._normalise(embedding),
+            "intent": intent,
+            "document_key": document_key,
+            "corpus_version": corpus_version,
+            "draft_verdict": draft_verdict,
+            "citations": citations,
+            "consistency_score": consistency_score,
+            "expires": time.monotonic() + self.ttl_seconds,
+        }
+        with self.lock:
+            self.entries[str(uuid.uuid4())] = entry
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def metrics(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    @staticmethod
+    def _normalise(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+answer_cache = SemanticAnswerCache()
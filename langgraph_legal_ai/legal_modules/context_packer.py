@@ -0,0 +1,130 @@
+#
+# Token-Budgeted Context Packing
+#
+
+import os
+import re
+from typing import Callable, List
+
+from langchain_core.documents import Document
+
+try:
+    import tiktoken
+
+    _encoding = tiktoken.get_encoding(os.getenv("CONTEXT_TOKEN_ENCODING", "o200k_base"))
+except Exception as e:
+    print(f"Context packer: tiktoken unavailable ({e}), estimating tokens")
+    _encoding = None
+
+DEFAULT_CONTEXT_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+CONTEXT_TOKEN_BUDGETS = {
+    "compliance_and_loophole_validator": int(
+        os.getenv("COMPLIANCE_CONTEXT_BUDGET", "4000")
+    ),
+    "precedent_matcher": int(os.getenv("PRECEDENT_CONTEXT_BUDGET", "2000")),
+}
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.8"))
+
+# Below this many tokens a truncated chunk is more noise than context
+MIN_TRUNCATED_TOKENS = 64
+WORD = re.compile(r"\w+")
+
+
+def count_tokens(text: str) -> int:
+    """Count the tokens of a text locally."""
+    if _encoding is None:
+        return len(text) // 4
+    return len(_encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut a text to at most `max_tokens`, ending on a whole sentence or word where possible."""
+    if _encoding is None:
+        cut = text[: max_tokens * 4]
+    else:
+        tokens = _encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        cut = _encoding.decode(tokens[:max_tokens])
+
+    if len(cut) >= len(text):
+        return text
+    boundary = max(cut.rfind(". "), cut.rfind("\n"))
+    if boundary < len(cut) // 2:
+        boundary = cut.rfind(" ")
+    return (cut[: boundary + 1] if boundary > 0 else cut).rstrip() + " ..."
+
+
+def _shingles(text: str) -> set:
+    words = WORD.findall(text.lower())
+    return {" ".join(words[i : i + 3]) for i in range(max(len(words) - 2, 1))}
+
+
+def _is_near_duplicate(shingles: set, kept: List[set]) -> bool:
+    for other in kept:
+        union = len(shingles | other)
+        if union and len(shingles & other) / union >= NEAR_DUPLICATE_THRESHOLD:
+            return True
+    return False
+
+
+def pack_documents(
+    docs: List[Document],
+    node_name: str,
+    format_doc: Callable[[Document], str],
+    separator: str = "\n\n",
+) -> str:
+    """
+    Packs retrieved documents into a prompt context that fits the token budget of a node.
+
+    Documents are taken in order of their `relevance_score` metadata, near-duplicates of
+    an already packed document are dropped, and the last document that does not fit is truncated.
+
+    Parameters:
+    docs (List[Document]): The retrieved documents.
+    node_name (str): The node the context is for, selects the token budget.
+    format_doc (Callable): Renders one document for the prompt.
+    separator (str): Placed between the rendered documents.
+
+    Returns:
+    str: The packed context.
+    """
+    budget = CONTEXT_TOKEN_BUDGETS.get(node_name, DEFAULT_CONTEXT_BUDGET)
+    ranked = sorted(
+        docs, key=lambda d: d.metadata.get("relevance_score", 0.0), reverse=True
+    )
+    separator_tokens = count_tokens(separator)
+
+    packed, kept_shingles = [], []
+    tokens_before = tokens_after = 0
+    dropped = truncated = 0
+
+    for doc in ranked:
+        text = format_doc(doc)
+        tokens = count_tokens(text)
+        tokens_before += tokens
+
+        shingles = _shingles(doc.page_content)
+        if _is_near_duplicate(shingles, kept_shingles):
+            dropped += 1
+            continue
+
+        remaining = budget - tokens_after - (separator_tokens if packed else 0)
+        if tokens > remaining:
+            if remaining < MIN_TRUNCATED_TOKENS:
+                dropped += 1
+                continue
+            text = truncate_to_tokens(text, remaining)
+            tokens = count_tokens(text)
+            truncated += 1
+
+        packed.append(text)
+        kept_shingles.append(shingles)
+        tokens_after += tokens + (separator_tokens if len(packed) > 1 else 0)
+
+    print(
+        f"Context packer [{node_name}]: {len(docs)} docs / {tokens_before} tokens -> "
+        f"{len(packed)} docs / {tokens_after} tokens "
+        f"(budget {budget}, dropped {dropped}, truncated {truncated})"
+    )
+    return separator.join(packed)
@@ -0,0 +1,51 @@
+#
+# Request Deadlines and Graceful Degradation
+#
+
+import os
+import time
+from typing import Optional
+
+# Default time budget of a graph run in seconds, 0 means no deadline
+GRAPH_DEADLINE_SECONDS = float(os.getenv("GRAPH_DEADLINE_SECONDS", "0"))
+
+# Each degradation kicks in once fewer than this many seconds are left
+DEGRADE_BELOW = {
+    "skipped_web_search": float(os.getenv("DEGRADE_WEB_SEARCH_BELOW", "30")),
+    "reduced_retrieval": float(os.getenv("DEGRADE_RETRIEVAL_BELOW", "40")),
+    "skipped_audit": float(os.getenv("DEGRADE_AUDIT_BELOW", "15")),
+    "skipped_chat_summary": float(os.getenv("DEGRADE_CHAT_SUMMARY_BELOW", "8")),
+}
+
+# Chunks per retrieval query once retrieval is reduced
+REDUCED_RETRIEVAL_K = 2
+
+
+def deadline_from_now(seconds: Optional[float]) -> Optional[float]:
+    """Return the monotonic deadline `seconds` from now, falling back to GRAPH_DEADLINE_SECONDS; None for no deadline."""
+    seconds = seconds if seconds is not None else GRAPH_DEADLINE_SECONDS
+    return time.monotonic() + seconds if seconds and seconds > 0 else None
+
+
+def remaining_seconds(config: Optional[dict]) -> Optional[float]:
+    """Seconds left before the deadline carried in the run config, or None without a deadline."""
+    deadline = ((config or {}).get("configurable") or {}).get("deadline")
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def should_degrade(config: Optional[dict], degradation: str) -> bool:
+    """
+    Checks if a node should apply a degradation because the run is running out of time.
+
+    Parameters:
+    config (dict): The run config of the node.
+    degradation (str): A key of DEGRADE_BELOW.
+
+    Returns:
+    bool: True if less time is left than the degradation's threshold.
+    """
+    remaining = remaining_seconds(config)
+    if remaining is None or remaining >= DEGRADE_BELOW[degradation]:
+        return False
+    print(f"Deadline: {remaining:.1f}s left, applying {degradation}")
+    return True
@@ -0,0 +1,177 @@
+#
+# Process-Wide LLM Concurrency and Rate Governor
+#
+
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from contextlib import asynccontextmanager
+
+LLM_MAX_CONCURRENT = int(os.getenv("LLM_MAX_CONCURRENT", "8"))
+# Requests and tokens per minute allowed by the endpoint, 0 disables the limit
+LLM_RPM = int(os.getenv("LLM_RPM", "0"))
+LLM_TPM = int(os.getenv("LLM_TPM", "0"))
+# Pause for every caller after a 429 without a Retry-After header
+LLM_RATE_LIMIT_BACKOFF = float(os.getenv("LLM_RATE_LIMIT_BACKOFF", "5"))
+
+# Lower value is served first: nodes on the user's critical path before background work
+NODE_PRIORITY = {
+    "decompose_to_analysis_units": 0,
+    "synthesize_verdict": 0,
+    "chain_summariser": 0,
+    "compliance_and_loophole_validator": 1,
+    "precedent_matcher": 1,
+    "consistency_auditor_and_cite": 1,
+    "risk_and_remediation_assessor": 2,
+    "finalize_and_summarise_response": 2,
+}
+
+
+class TokenBucket:
+    """A per-minute budget that refills continuously. A zero budget means unlimited."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = per_minute
+        self.level = float(per_minute)
+        self.rate = per_minute / 60
+        self.updated = time.monotonic()
+
+    def delay(self, amount: int) -> float:
+        """Seconds until `amount` can be taken."""
+        if not self.capacity:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: int):
+        """Spend `amount`. A negative amount refunds an over-estimate."""
+        if self.capacity:
+            self._refill()
+            self.level = min(self.capacity, self.level - amount)
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class LLMGovernor:
+    """
+    Shares the model endpoint between all concurrent graph runs of the process.
+
+    Calls wait in a priority queue (by node criticality) until a concurrency slot is free and
+    the request and token buckets allow them. A 429 from the endpoint pauses every caller for
+    the Retry-After period instead of letting each node hammer the endpoint on its own.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = LLM_MAX_CONCURRENT,
+        requests_per_minute: int = LLM_RPM,
+        tokens_per_minute: int = LLM_TPM,
+    ):
+        self.max_concurrent = max_concurrent
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.in_flight = 0
+        self.waiters = []
+        self.sequence = itertools.count()
+        self.paused_until = 0.0
+        self.wakeup = None
+        self.granted = 0
+        self.queued_total = 0
+        self.throttled = 0
+
+    @asynccontextmanager
+    async def slot(self, node_name: str, estimated_tokens: int):
+        """
+        Hold an LLM call slot for the duration of the block.
+
+        Parameters:
+        node_name (str): The calling node, selects the queue priority.
+        estimated_tokens (int): Tokens the call is expected to use, charged to the token bucket.
+        """
+        await self._acquire(NODE_PRIORITY.get(node_name, 1), estimated_tokens)
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._dispatch()
+
+    def settle(self, estimated_tokens: int, used_tokens: int):
+        """Correct the token bucket once the real usage of a call is known."""
+        if used_tokens:
+            self.tokens.take(used_tokens - estimated_tokens)
+
+    def backoff(self, retry_after: float = None):
+        """Pause all callers after the endpoint answered 429."""
+        self.throttled += 1
+        delay = retry_after if retry_after else LLM_RATE_LIMIT_BACKOFF
+        self.paused_until = max(self.paused_until, time.monotonic() + delay)
+        print(f"LLM governor: rate limited, pausing all calls for {delay:.1f}s")
+
+    def queued(self) -> int:
+        return sum(1 for _, _, waiter, _ in self.waiters if not waiter.done())
+
+    def metrics(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "max_concurrent": self.max_concurrent,
+            "queued": self.queued(),
+            "granted": self.granted,
+            "queued_total": self.queued_total,
+            "throttled": self.throttled,
+            "paused_for_s": round(max(0.0, self.paused_until - time.monotonic()), 2),
+        }
+
+    async def _acquire(self, priority: int, tokens: int):
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (priority, next(self.sequence), waiter, tokens))
+        self._dispatch()
+        if not waiter.done():
+            self.queued_total += 1
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # The slot may have been handed over just before the cancellation
+            if waiter.done() and not waiter.cancelled():
+                self.in_flight -= 1
+                self._dispatch()
+            raise
+
+    def _dispatch(self):
+        """Grant slots to waiters in priority order while the limits allow."""
+        while self.waiters:
+            _, _, waiter, tokens = self.waiters[0]
+            if waiter.done():
+                heapq.heappop(self.waiters)
+                continue
+            if self.in_flight >= self.max_concurrent:
+                return
+
+            delay = max(
+                self.paused_until - time.monotonic(),
+                self.requests.delay(1),
+                self.tokens.delay(tokens),
+            )
+            if delay > 0:
+                self._schedule_wakeup(delay)
+                return
+
+            heapq.heappop(self.waiters)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            self.in_flight += 1
+            self.granted += 1
+            waiter.set_result(None)
+
+    def _schedule_wakeup(self, delay: float):
+        if self.wakeup is not None and not self.wakeup.cancelled():
+            self.wakeup.cancel()
+        self.wakeup = asyncio.get_running_loop().call_later(delay, self._dispatch)
+
+
+llm_governor = LLMGovernor()
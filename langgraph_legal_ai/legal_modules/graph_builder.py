@@ -2,27 +2,31 @@
 # 7. GRAPH BUILDING
 #
 
-import sqlite3
+import asyncio
 
-from langgraph.checkpoint.sqlite import SqliteSaver
+import aiosqlite
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
 from langgraph.graph import END, START, StateGraph
-from legal_modules.nodes.compliance_and_loophole_validator import \
-    compliance_and_loophole_validator
-from legal_modules.nodes.consistency_auditor_and_cite import \
-    consistency_auditor_and_cite
-from legal_modules.nodes.decompose_to_analysis_units import \
-    decompose_to_analysis_units
-from legal_modules.nodes.finalize_and_summarise_response import \
-    finalize_and_summarise_response
-from legal_modules.nodes.ingest_document_if_needed import \
-    ingest_document_if_needed
-from legal_modules.nodes.parallel_join_gate import parallel_join_gate
+from legal_modules.nodes.compliance_and_loophole_validator import (
+    compliance_and_loophole_validator,
+)
+from legal_modules.nodes.consistency_auditor_and_cite import (
+    consistency_auditor_and_cite,
+)
+from legal_modules.nodes.decompose_to_analysis_units import decompose_to_analysis_units
+from legal_modules.nodes.finalize_and_summarise_response import (
+    finalize_and_summarise_response,
+)
+from legal_modules.nodes.ingest_document_if_needed import ingest_document_if_needed
 from legal_modules.nodes.precedent_matcher import precedent_matcher
 from legal_modules.nodes.retriever import retriever
-from legal_modules.nodes.risk_and_remediation_assessor import \
-    risk_and_remediation_assessor
+from legal_modules.nodes.risk_and_remediation_assessor import (
+    risk_and_remediation_assessor,
+)
 from legal_modules.nodes.synthesize_verdict import synthesize_verdict
+from legal_modules.setup import CHECKPOINT_DB
 from legal_modules.state import AgentState
+from legal_modules.timing import timed_node
 
 
 def build_legal_graph() -> StateGraph:
@@ -32,37 +36,63 @@ def build_legal_graph() -> StateGraph:
     """
     workflow = StateGraph(AgentState)
 
-    # Nodes
-    workflow.add_node("ingest_document_if_needed", ingest_document_if_needed)
-    workflow.add_node("decompose_to_analysis_units", decompose_to_analysis_units)
-    workflow.add_node("retriever", retriever)
+    # Nodes (each run is timed)
     workflow.add_node(
-        "compliance_and_loophole_validator", compliance_and_loophole_validator
+        "ingest_document_if_needed",
+        timed_node("ingest_document_if_needed", ingest_document_if_needed),
     )
-    workflow.add_node("precedent_matcher", precedent_matcher)
-    workflow.add_node("risk_and_remediation_assessor", risk_and_remediation_assessor)
-    workflow.add_node("parallel_join_gate", parallel_join_gate)
-    workflow.add_node("synthesize_verdict", synthesize_verdict)
-    workflow.add_node("consistency_auditor_and_cite", consistency_auditor_and_cite)
     workflow.add_node(
-        "finalize_and_summarise_response", finalize_and_summarise_response
+        "decompose_to_analysis_units",
+        timed_node("decompose_to_analysis_units", decompose_to_analysis_units),
+    )
+    workflow.add_node("retriever", timed_node("retriever", retriever))
+    workflow.add_node(
+        "compliance_and_loophole_validator",
+        timed_node(
+            "compliance_and_loophole_validator", compliance_and_loophole_validator
+        ),
+    )
+    workflow.add_node(
+        "precedent_matcher", timed_node("precedent_matcher", precedent_matcher)
+    )
+    workflow.add_node(
+        "risk_and_remediation_assessor",
+        timed_node("risk_and_remediation_assessor", risk_and_remediation_assessor),
+    )
+    workflow.add_node(
+        "synthesize_verdict", timed_node("synthesize_verdict", synthesize_verdict)
+    )
+    workflow.add_node(
+        "consistency_auditor_and_cite",
+        timed_node("consistency_auditor_and_cite", consistency_auditor_and_cite),
+    )
+    workflow.add_node(
+        "finalize_and_summarise_response",
+        timed_node("finalize_and_summarise_response", finalize_and_summarise_response),
     )
 
     # Edges
     workflow.add_edge(START, "ingest_document_if_needed")
     workflow.add_edge("ingest_document_if_needed", "decompose_to_analysis_units")
 
-    # Conditional: Check if legal context
+    # Conditional: Check if legal context, or if a cached answer can be reused
+    def route_after_decompose(state: AgentState) -> str:
+        if not state.get("intent_classification", {}).get(
+            "query_related_to_legal_context", True
+        ):
+            return "end"
+        if state.get("answer_cache_hit"):
+            return "cached"
+        return "continue"
+
     workflow.add_conditional_edges(
         "decompose_to_analysis_units",
-        lambda state: (
-            "end"
-            if not state.get("intent_classification", {}).get(
-                "query_related_to_legal_context", True
-            )
-            else "continue"
-        ),
-        {"end": END, "continue": "retriever"},
+        route_after_decompose,
+        {
+            "end": END,
+            "cached": "finalize_and_summarise_response",
+            "continue": "retriever",
+        },
     )
 
     # Parallel Fan-out
@@ -73,14 +103,9 @@ def build_legal_graph() -> StateGraph:
         "compliance_and_loophole_validator", "risk_and_remediation_assessor"
     )
 
-    # Parallel Fan-in
-    workflow.add_edge("risk_and_remediation_assessor", "parallel_join_gate")
-    workflow.add_edge("precedent_matcher", "parallel_join_gate")
-
-    workflow.add_conditional_edges(
-        "parallel_join_gate",
-        lambda state: "continue" if state.get("parallel_join_complete") else "wait",
-        {"continue": "synthesize_verdict", "wait": "parallel_join_gate"},
+    # Parallel Fan-in: synthesis waits until both branches have finished
+    workflow.add_edge(
+        ["risk_and_remediation_assessor", "precedent_matcher"], "synthesize_verdict"
     )
 
     workflow.add_edge("synthesize_verdict", "consistency_auditor_and_cite")
@@ -108,8 +133,33 @@ def build_legal_graph() -> StateGraph:
     return workflow
 
 
-conn = sqlite3.connect("./db/checkpoints.sqlite", check_same_thread=False)
-checkpointer = SqliteSaver(conn)
+_app = None
+_conn = None
+_app_lock = asyncio.Lock()
+
 
-# Compile App
-app = build_legal_graph().compile(checkpointer=checkpointer)
+async def get_app():
+    """
+    Returns the compiled legal graph backed by an async SQLite checkpointer.
+    The checkpointer has to be created inside the running event loop, so the graph is compiled on first use and reused afterwards.
+    """
+    global _app, _conn
+    async with _app_lock:
+        if _app is None:
+            _conn = await aiosqlite.connect(CHECKPOINT_DB)
+            checkpointer = AsyncSqliteSaver(_conn)
+
+            # Compile App
+            _app = build_legal_graph().compile(checkpointer=checkpointer)
+    return _app
+
+
+async def close_app():
+    """
+    Closes the checkpointer connection of the compiled graph. The next get_app() compiles it again.
+    """
+    global _app, _conn
+    async with _app_lock:
+        if _conn is not None:
+            await _conn.close()
+        _app, _conn = None, None
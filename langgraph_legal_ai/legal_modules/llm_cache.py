@@ -0,0 +1,114 @@
+#
+# Persistent Exact-Match LLM Cache
+#
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+
+
+class SQLiteLLMCache(BaseCache):
+    """
+    A disk-backed LLM response cache keyed by the model parameters and the rendered prompt.
+
+    Entries are evicted least-recently-used first once the stored responses exceed `max_bytes`.
+    """
+
+    def __init__(self, database_path: str, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self.conn = sqlite3.connect(database_path, check_same_thread=False)
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )""")
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS llm_cache_last_access ON llm_cache (last_access)"
+        )
+        self.conn.commit()
+
+    @staticmethod
+    def make_key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode()).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = self.make_key(prompt, llm_string)
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT value FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.conn.execute(
+                "UPDATE llm_cache SET last_access = ? WHERE key = ?", (time.time(), key)
+            )
+            self.conn.commit()
+
+        try:
+            return [loads(generation) for generation in json.loads(row[0])]
+        except Exception as e:
+            print(f"LLM cache entry could not be loaded: {e}")
+            return None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE):
+        value = json.dumps([dumps(generation) for generation in return_val])
+        key = self.make_key(prompt, llm_string)
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, len(value), time.time()),
+            )
+            self._evict()
+            self.conn.commit()
+
+    def clear(self, **kwargs):
+        with self.lock:
+            self.conn.execute("DELETE FROM llm_cache")
+            self.conn.commit()
+
+    def metrics(self) -> dict:
+        with self.lock:
+            entries, size = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    def _evict(self):
+        (total,) = self.conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM llm_cache"
+        ).fetchone()
+        if total <= self.max_bytes:
+            return
+
+        rows = self.conn.execute(
+            "SELECT key, size FROM llm_cache ORDER BY last_access"
+        ).fetchall()
+        stale = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        self.conn.executemany("DELETE FROM llm_cache WHERE key = ?", stale)
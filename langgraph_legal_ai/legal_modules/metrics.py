@@ -0,0 +1,137 @@
+#
+# Per-Node LLM Metrics
+#
+
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from legal_modules.timing import timings
+
+
+class NodeLLMMetrics:
+    """
+    Records latency and token usage of the LLM calls made by each node.
+
+    One handler is attached to the chat model of every node, so the counts are
+    grouped by node name regardless of which chain or graph run made the call.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = {}
+        self.nodes = defaultdict(
+            lambda: {
+                "model": None,
+                "calls": 0,
+                "errors": 0,
+                "latency_total": 0.0,
+                "latency_max": 0.0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+            }
+        )
+
+    def handler(self, node_name: str, model: str) -> "NodeCallback":
+        """Return the callback to attach to the chat model of a node."""
+        with self.lock:
+            self.nodes[node_name]["model"] = model
+        return NodeCallback(self, node_name)
+
+    def start(self, run_id: UUID):
+        with self.lock:
+            self.started[run_id] = time.perf_counter()
+
+    def finish(
+        self,
+        node_name: str,
+        run_id: UUID,
+        response: Optional[LLMResult] = None,
+    ):
+        with self.lock:
+            started = self.started.pop(run_id, None)
+        latency = time.perf_counter() - started if started is not None else 0.0
+        timings.observe("llm", node_name, latency, error=response is None)
+
+        with self.lock:
+            node = self.nodes[node_name]
+            if response is None:
+                node["errors"] += 1
+                return
+
+            node["calls"] += 1
+            node["latency_total"] += latency
+            node["latency_max"] = max(node["latency_max"], latency)
+
+            prompt_tokens, completion_tokens = token_usage(response)
+            node["prompt_tokens"] += prompt_tokens
+            node["completion_tokens"] += completion_tokens
+        timings.add_tokens(node_name, prompt_tokens, completion_tokens)
+
+    def metrics(self) -> dict:
+        with self.lock:
+            return {
+                node_name: {
+                    "model": node["model"],
+                    "calls": node["calls"],
+                    "errors": node["errors"],
+                    "avg_latency_s": (
+                        round(node["latency_total"] / node["calls"], 3)
+                        if node["calls"]
+                        else 0.0
+                    ),
+                    "max_latency_s": round(node["latency_max"], 3),
+                    "prompt_tokens": node["prompt_tokens"],
+                    "completion_tokens": node["completion_tokens"],
+                }
+                for node_name, node in self.nodes.items()
+            }
+
+
+class NodeCallback(BaseCallbackHandler):
+    """Forwards the LLM events of one node's chat model to NodeLLMMetrics."""
+
+    def __init__(self, collector: NodeLLMMetrics, node_name: str):
+        self.collector = collector
+        self.node_name = node_name
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs):
+        self.collector.start(run_id)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs):
+        self.collector.start(run_id)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+        self.collector.finish(self.node_name, run_id, response)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self.collector.finish(self.node_name, run_id)
+
+
+def token_usage(response: LLMResult) -> tuple:
+    """Return the (prompt, completion) token counts reported for an LLM response."""
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage:
+        return (
+            usage.get("prompt_tokens", 0) or 0,
+            usage.get("completion_tokens", 0) or 0,
+        )
+
+    # Streamed and cached responses carry the usage on the message instead
+    prompt_tokens = completion_tokens = 0
+    for generations in response.generations:
+        for generation in generations:
+            metadata = getattr(
+                getattr(generation, "message", None), "usage_metadata", None
+            )
+            if metadata:
+                prompt_tokens += metadata.get("input_tokens", 0)
+                completion_tokens += metadata.get("output_tokens", 0)
+    return prompt_tokens, completion_tokens
+
+
+llm_metrics = NodeLLMMetrics()
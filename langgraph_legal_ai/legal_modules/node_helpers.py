@@ -1,12 +1,18 @@
+import asyncio
 import re
+import threading
 
 from langchain_chroma import Chroma
 from langchain_core.documents import Document
-from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.output_parsers import JsonOutputParser, StrOutputParser
 from langchain_experimental.text_splitter import SemanticChunker
 from langchain_text_splitters import RecursiveCharacterTextSplitter
+from legal_modules.answer_cache import answer_cache
+from legal_modules.chain_summariser import chain as voice_summary_chain
+from legal_modules.context_packer import pack_documents
 from legal_modules.prompts import *
-from legal_modules.setup import embeddings, llm
+from legal_modules.schemas import PrecedentMatches
+from legal_modules.setup import CORPUS_VERSION, USER_DOCS_DIR, embeddings, get_llm
 from legal_modules.tools import web_search_tool, websearch_llm
 from legal_modules.utils import *
 
@@ -25,13 +31,16 @@ def is_node_blocked(state: dict, NODE_NAME: str) -> bool:
     return NODE_NAME not in state.get("actions_needed", [])
 
 
-def chunk_and_save_to_chromadb(document_text: str, document_path: str):
+def chunk_and_save_to_chromadb(
+    document_text: str, document_path: str, collection_name: str = None
+):
     """
     Chunk a document into smaller pieces and save them to a ChromaDB collection.
 
     Parameters:
     document_text (str): The text of the document to chunk.
     document_path (str): The path to the document.
+    collection_name (str): The collection to save to. Derived from the document content if not given.
 
     Returns:
     str: The name of the ChromaDB collection where the document was saved.
@@ -39,7 +48,7 @@ def chunk_and_save_to_chromadb(document_text: str, document_path: str):
 
     # 1. Initialize Semantic Chunker
     text_splitter = SemanticChunker(
-        embeddings=embeddings,  
+        embeddings=embeddings,
         breakpoint_threshold_type="percentile",
         breakpoint_threshold_amount=85,
     )
@@ -75,13 +84,15 @@ def chunk_and_save_to_chromadb(document_text: str, document_path: str):
     #     for chunk in chunks
     # ]
 
-    collection_name = get_user_doc_collection_name(document_path)
+    collection_name = collection_name or get_user_doc_collection_name(document_path)
 
-    # Create separate vectorstore for user doc
+    # Create separate vectorstore for user doc. Chunk ids are deterministic, so ingesting
+    # the same document again upserts its chunks instead of duplicating them.
     user_vectorstore = Chroma.from_documents(
         documents=enriched_documents,
+        ids=[f"{collection_name}_{i}" for i in range(len(enriched_documents))],
         collection_name=collection_name,
-        persist_directory="./user-docs",
+        persist_directory=USER_DOCS_DIR,
         embedding=embeddings,
     )
 
@@ -90,6 +101,48 @@ def chunk_and_save_to_chromadb(document_text: str, document_path: str):
     return user_vectorstore._collection_name
 
 
+# Ingestion locks per collection, so concurrent first uploads of one document ingest it once
+ingest_locks = {}
+ingest_locks_guard = threading.Lock()
+
+
+def ingest_user_document(document_text: str, document_path: str) -> str:
+    """
+    Store a user document in its content-addressed ChromaDB collection.
+    Chunking and embedding are skipped when the same bytes were fully ingested before; the collection is
+    marked complete only after every chunk is stored, so a collection left by a failed ingestion is emptied and ingested again.
+    Ingestion of a collection is serialised, so concurrent uploads of the same bytes wait for the first one.
+
+    Parameters:
+    document_text (str): The text of the document.
+    document_path (str): The path to the document.
+
+    Returns:
+    str: The name of the ChromaDB collection holding the document.
+    """
+    collection_name = get_user_doc_collection_name(document_path)
+
+    with ingest_locks_guard:
+        lock = ingest_locks.setdefault(collection_name, threading.Lock())
+
+    with lock:
+        existing = Chroma(
+            collection_name=collection_name,
+            persist_directory=USER_DOCS_DIR,
+            embedding_function=embeddings,
+        )
+        if (existing._collection.metadata or {}).get("ingest_complete"):
+            print(f"Document already ingested in collection: {collection_name}")
+            return collection_name
+        if existing._collection.count() > 0:
+            print(f"Repairing partly ingested collection: {collection_name}")
+            delete_doc_from_collection(USER_DOCS_DIR, collection_name)
+
+        chunk_and_save_to_chromadb(document_text, document_path, collection_name)
+        existing._collection.modify(metadata={"ingest_complete": True})
+        return collection_name
+
+
 def get_analysis_units(
     result: dict, intent: str, document_text: str, user_doc_collection: str
 ):
@@ -129,7 +182,7 @@ def get_analysis_units(
             try:
                 user_db = Chroma(
                     collection_name=collection_name,
-                    persist_directory="./user-docs",
+                    persist_directory=USER_DOCS_DIR,
                     embedding_function=embeddings,
                 )
                 docs = retrieve_filtered_documents(user_db, user_query, k=5)
@@ -144,7 +197,7 @@ def get_analysis_units(
     return analysis_units
 
 
-def get_relevant_docs(query, analysis_units, db):
+def get_relevant_docs(query, analysis_units, db, prefetched_docs=None, k=5):
     """
     Retrieves relevant documents from the database based on the user query and analysis units.
 
@@ -152,21 +205,33 @@ def get_relevant_docs(query, analysis_units, db):
     query (str): The user query.
     analysis_units (list): A list of analysis units.
     db (Chroma): The Chroma database object.
+    prefetched_docs (list): Documents already retrieved for the user query, if any.
+    k (int): The number of chunks retrieved per query.
 
     Returns:
     list: A list of relevant documents.
     """
     queries = [query] + analysis_units
     unique_docs = []
-    seen = set()
+    seen = {}
 
-    for q in queries:
-        docs = retrieve_filtered_documents(db, q, k=5, threshold=0.1)
+    for i, q in enumerate(queries):
+        if i == 0 and prefetched_docs is not None:
+            docs = prefetched_docs
+        else:
+            docs = retrieve_filtered_documents(db, q, k=k, threshold=0.1)
         for doc in docs:
             key = (doc.page_content.strip(), doc.metadata.get("source"))
             if key not in seen:
-                seen.add(key)
+                seen[key] = doc
                 unique_docs.append(doc)
+            else:
+                # Keep the best score of a chunk found by several queries
+                kept = seen[key]
+                kept.metadata["relevance_score"] = max(
+                    kept.metadata.get("relevance_score", 0.0),
+                    doc.metadata.get("relevance_score", 0.0),
+                )
 
     if not unique_docs:
         unique_docs = [
@@ -200,7 +265,7 @@ def extract_loopholes(findings):
     ]
 
 
-def execute_search_tool(raw_llm_response):
+async def execute_search_tool(raw_llm_response):
     """
     Executes a search tool based on the tool calls in the raw_llm_response.
     Supports web search tool.
@@ -222,7 +287,7 @@ def execute_search_tool(raw_llm_response):
         if selected_tool:
             try:
                 # Execute the search
-                tool_output = selected_tool.invoke(tool_call["args"])
+                tool_output = await selected_tool.ainvoke(tool_call["args"])
 
                 # Format Web Results
                 search_results = tool_output.get("results", [])
@@ -239,7 +304,36 @@ def execute_search_tool(raw_llm_response):
     return web_context
 
 
-def match_precedent(user_query: str, messages: list, local_case_context: str):
+def parse_precedent_matches(llm_response) -> list:
+    """
+    Parses the precedent matches from the JSON content of an LLM reply.
+
+    Parameters:
+    llm_response (AIMessage): The reply of the precedent matcher.
+
+    Returns:
+    list: The matches, or an empty list if the reply holds no JSON list.
+    """
+    if not isinstance(llm_response.content, str) or not llm_response.content.strip():
+        return []
+
+    try:
+        matches = JsonOutputParser().invoke(llm_response)
+    except Exception as e:
+        print(f"Precedent Matcher: Could not parse the reply: {e}")
+        return []
+
+    if isinstance(matches, dict):
+        matches = matches.get("matches", [])
+    return matches if isinstance(matches, list) else []
+
+
+async def match_precedent(
+    user_query: str,
+    messages: list,
+    local_case_context: str,
+    allow_web_search: bool = True,
+):
     """
     A node that matches the user query with relevant precedents from the database of legal cases.
     If needed, external resources (web search) are used to find relevant precedents.
@@ -248,6 +342,7 @@ def match_precedent(user_query: str, messages: list, local_case_context: str):
     user_query (str): The user query to be matched with precedents.
     messages (list): The previous chat messages.
     local_case_context (str): The context of local legal cases.
+    allow_web_search (bool): Whether the model may search the web for more cases.
 
     Returns:
     dict: A dictionary containing the relevant precedents, the current step, and the status of different nodes.
@@ -256,7 +351,10 @@ def match_precedent(user_query: str, messages: list, local_case_context: str):
     Exception: If there is an error executing the web search tool or processing the LLM response.
     """
     try:
-        raw_llm_response = (precedent_matcher_prompt | websearch_llm).invoke(
+        matcher_llm = (
+            websearch_llm if allow_web_search else get_llm("precedent_matcher")
+        )
+        raw_llm_response = await (precedent_matcher_prompt | matcher_llm).ainvoke(
             {
                 "user_query": user_query,
                 "messages": messages,
@@ -264,41 +362,36 @@ def match_precedent(user_query: str, messages: list, local_case_context: str):
             }
         )
 
-        web_context = ""
-        if hasattr(raw_llm_response, "tool_calls") and raw_llm_response.tool_calls:
-            print("Precedent Matcher: Initiating Web Search for additional cases...")
-            web_context = execute_search_tool(raw_llm_response)
-        else:
+        if not getattr(raw_llm_response, "tool_calls", None):
+            # The model answered from local knowledge, so its reply already holds the matches
             print("Precedent Matcher: Using local knowledge only.")
+            matches = parse_precedent_matches(raw_llm_response)
+        else:
+            print("Precedent Matcher: Initiating Web Search for additional cases...")
+            web_context = await execute_search_tool(raw_llm_response)
 
-        if web_context:
-            print(
-                "Precedent Matcher: Web Search found additional cases and passsed to llm..."
-            )
-
-            matches = (
-                final_precedent_matcher_prompt | llm | JsonOutputParser()
-            ).invoke(
+            # The tool call holds no matches, so they are asked for again, from the local cases
+            # alone when the search found nothing (no API key, failed fetch, no results)
+            if web_context:
+                print(
+                    "Precedent Matcher: Web Search found additional cases and passsed to llm..."
+                )
+            else:
+                print("Precedent Matcher: Web Search found nothing, using local cases.")
+            result = await (
+                final_precedent_matcher_prompt
+                | get_llm("precedent_matcher").with_structured_output(
+                    PrecedentMatches, method="function_calling"
+                )
+            ).ainvoke(
                 {
                     "user_query": user_query,
                     "messages": messages,
                     "local_case_context": local_case_context,
-                    "web_context": web_context,
+                    "web_context": web_context or "No web search results.",
                 }
             )
-        else:
-
-            # Parsing the text content directly if it's already an answer
-            if isinstance(raw_llm_response.content, str):
-                matches = (precedent_matcher_prompt | llm | JsonOutputParser()).invoke(
-                    {
-                        "user_query": user_query,
-                        "messages": messages,
-                        "local_case_context": local_case_context,
-                    }
-                )
-            else:
-                matches = []
+            matches = [match.model_dump() for match in result.matches]
 
         return {"precedent_matches": matches[:3], "precedent_done": True}
 
@@ -307,6 +400,62 @@ def match_precedent(user_query: str, messages: list, local_case_context: str):
         return {"precedent_matches": [], "precedent_done": True}
 
 
+def lookup_cached_answer(state: dict, optimised_query: str, intent: str):
+    """
+    Looks up a cached verdict for a semantically similar query with the same intent, document and corpus version.
+
+    Parameters:
+    state (dict): The current state of the agent.
+    optimised_query (str): The optimised user query.
+    intent (str): The classified intent.
+
+    Returns:
+    dict: The cached entry with `draft_verdict`, `citations` and `consistency_score`, or None on a miss or when bypassed.
+    """
+    if state.get("bypass_answer_cache") or not optimised_query:
+        return None
+
+    return answer_cache.lookup(
+        embeddings.embed_query(optimised_query),
+        intent,
+        state.get("user_doc_collection"),
+        CORPUS_VERSION,
+    )
+
+
+def store_cached_answer(state: dict):
+    """
+    Stores the verdict of a completed, consistent run in the answer cache.
+    The cache is shared by every thread, so only verdicts that cannot hold a user's own facts are stored:
+    those of a first question without a document, whose synthesis saw no previous chats.
+
+    Parameters:
+    state (dict): The current state of the agent.
+    """
+    verdict = state.get("draft_verdict")
+    if (
+        state.get("bypass_answer_cache")
+        or state.get("answer_cache_hit")
+        or state.get("needs_review")
+        or state.get("messages")
+        or state.get("document_text")
+        or state.get("user_doc_collection")
+        or not verdict
+        or verdict.startswith("Error synthesizing")
+    ):
+        return
+
+    answer_cache.store(
+        embeddings.embed_query(state["user_query"]),
+        (state.get("intent_classification") or {}).get("intent", "general"),
+        state.get("user_doc_collection"),
+        CORPUS_VERSION,
+        verdict,
+        state.get("citations") or [],
+        state.get("consistency_score"),
+    )
+
+
 def get_citations(retrieved_docs: str):
     """
     Retrieves citations from the retrieved documents.
@@ -336,3 +485,89 @@ def get_citations(retrieved_docs: str):
             )
 
     return citations
+
+
+def fingerprint(*parts) -> str:
+    """Hash the inputs of a stage so unchanged work can be reused in a review pass."""
+    import hashlib
+    import json
+
+    return hashlib.sha256(
+        json.dumps(parts, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def reuse_stage(state: dict, stage: str, stage_fingerprint: str) -> bool:
+    """True if `stage` already ran with the same inputs during this question."""
+    if state.get("stage_fingerprints", {}).get(stage) == stage_fingerprint:
+        print(f"{stage}: inputs unchanged, reusing the previous result")
+        return True
+    return False
+
+
+def summary_key(state: dict) -> str:
+    """Identifies the inputs of the finalize summaries: the verdict, the question, the chat history length and whether a voice summary is wanted."""
+    import hashlib
+
+    return hashlib.sha256(
+        "\x00".join(
+            [
+                state.get("draft_verdict") or "",
+                state.get("input_query") or "",
+                str(len(state.get("messages", []))),
+                str(bool(state.get("want_voice_summary"))),
+            ]
+        ).encode()
+    ).hexdigest()
+
+
+async def summarise_verdict(state: dict, include_chat_summary: bool = True) -> dict:
+    """
+    Summarises the draft verdict for the chat history and, for voice requests, for the spoken reply, and the chat
+    history if it is too long. The summaries are independent, so they run together, and a failed one
+    does not fail the others: the verdict stands in for its summary, a failed voice or chat summary is left out.
+
+    Parameters:
+    state (dict): The current state of the agent.
+    include_chat_summary (bool): Whether a long chat history is summarised too.
+
+    Returns:
+    dict: The summary key, the verdict summary, the voice summary and the chat summary (each None if not needed).
+    """
+    NODE_NAME = "finalize_and_summarise_response"
+    verdict = state.get("draft_verdict", "")
+    messages = state.get("messages", [])
+
+    summarise_verdict_chain = (
+        summarise_verdict_prompt | get_llm(NODE_NAME) | StrOutputParser()
+    )
+    summaries = {
+        "verdict_summary": summarise_verdict_chain.ainvoke({"verdict": verdict})
+    }
+    # Text replies never speak the summary, so it is only written for voice requests
+    if state.get("want_voice_summary"):
+        summaries["voice_summary"] = voice_summary_chain.ainvoke(
+            {"user_query": state.get("input_query", ""), "legal_analysis": verdict}
+        )
+    if include_chat_summary and len(messages) > 6:
+        summarise_chat_chain = (
+            summarise_chat_prompt | get_llm(NODE_NAME) | StrOutputParser()
+        )
+        summaries["chat_summary"] = summarise_chat_chain.ainvoke(
+            {"chat_history": messages}
+        )
+
+    results = {}
+    outcomes = await asyncio.gather(*summaries.values(), return_exceptions=True)
+    for name, outcome in zip(summaries, outcomes):
+        if isinstance(outcome, Exception):
+            print(f"Summary {name} failed: {outcome}")
+        else:
+            results[name] = outcome.strip()
+
+    return {
+        "key": summary_key(state),
+        "verdict_summary": results.get("verdict_summary", verdict),
+        "voice_summary": results.get("voice_summary"),
+        "chat_summary": results.get("chat_summary"),
+    }
@@ -2,12 +2,12 @@
 from langchain_core.output_parsers import JsonOutputParser
 from legal_modules.node_helpers import *
 from legal_modules.prompts import *
-from legal_modules.setup import llm
+from legal_modules.setup import get_llm
 from legal_modules.state import AgentState
 
 
 #  4. Compliance & Loophole Validator
-def compliance_and_loophole_validator(state: AgentState) -> dict:
+async def compliance_and_loophole_validator(state: AgentState) -> dict:
     """
     Validates if the user query is compliant with relevant laws and regulations.
 
@@ -49,17 +49,28 @@ def compliance_and_loophole_validator(state: AgentState) -> dict:
             "doctrinal_done": True,
         }
 
-    legal_context = "\n\n".join(
-        [
-            f"[{d.metadata.get('section', 'N/A')}] {d.page_content.strip()}"
-            for d in retrieved_docs
-        ]
+    # Pack the most relevant provisions into the token budget of the node
+    legal_context = pack_documents(
+        retrieved_docs,
+        NODE_NAME,
+        lambda d: f"[{d.metadata.get('section', 'N/A')}] {d.page_content.strip()}",
     )
 
+    # A review pass that brought no new provisions does not need a new analysis
+    stage_fingerprint = fingerprint(user_query, analysis_units, legal_context)
+    if state.get("doctrinal_analysis") and reuse_stage(
+        state, NODE_NAME, stage_fingerprint
+    ):
+        return {"doctrinal_done": True}
+
     # Validate if the user query is compliant with relevant laws and regulations and find the loopholes
     try:
-        chain = complaince_and_loophole_validator_prompt | llm | JsonOutputParser()
-        result = chain.invoke(
+        chain = (
+            complaince_and_loophole_validator_prompt
+            | get_llm(NODE_NAME)
+            | JsonOutputParser()
+        )
+        result = await chain.ainvoke(
             {
                 "user_query": user_query,
                 "legal_context": legal_context,
@@ -87,6 +98,7 @@ def compliance_and_loophole_validator(state: AgentState) -> dict:
                 "summary": result.get("loophole_summary"),
             },
             "doctrinal_done": True,
+            "stage_fingerprints": {NODE_NAME: stage_fingerprint},
         }
     except Exception as e:
         print(f"Error in compliance node: {e}")
@@ -1,18 +1,39 @@
+import asyncio
+import os
+
 # LangChain / LangGraph Core
 from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.runnables import RunnableConfig
+from legal_modules.deadline import should_degrade
 from legal_modules.node_helpers import *
 from legal_modules.prompts import *
-from legal_modules.setup import llm
+from legal_modules.setup import get_llm
 from legal_modules.state import AgentState
 
+# Review issues passed back to retrieval and synthesis, each one costs a retrieval query
+REVIEW_ISSUES_MAX = int(os.getenv("REVIEW_ISSUES_MAX", "5"))
+
+
+def review_issues(audit: dict) -> list:
+    """The audit's issues as non-empty strings, at most REVIEW_ISSUES_MAX of them."""
+    issues = audit.get("issues") or []
+    if not isinstance(issues, list):
+        return []
+    return [i.strip() for i in issues if isinstance(i, str) and i.strip()][
+        :REVIEW_ISSUES_MAX
+    ]
+
 
 #  9. Consistency Auditor
-def consistency_auditor_and_cite(state: AgentState) -> dict:
+async def consistency_auditor_and_cite(
+    state: AgentState, config: RunnableConfig
+) -> dict:
     """
     A node that checks for consistency in the generated verdict and provides citations from the retrieved documents.
 
     Parameters:
     state (AgentState): The current state of the agent.
+    config (RunnableConfig): The run config, carries the request deadline.
 
     Returns:
     dict: A dictionary containing the citations, consistency score, needs review flag, and the current step.
@@ -26,6 +47,7 @@ def consistency_auditor_and_cite(state: AgentState) -> dict:
         return {
             "citations": [],
             "needs_review": False,
+            "speculative_summaries": None,
             "current_step": "consistency_auditor_and_cite",
         }
 
@@ -36,21 +58,73 @@ def consistency_auditor_and_cite(state: AgentState) -> dict:
     # Get the citations from the retrieved documents
     citations = get_citations(retrieved_docs)
 
+    # Close to the deadline, the draft is answered with its citations but without an audit
+    if should_degrade(config, "skipped_audit"):
+        return {
+            "citations": citations,
+            "needs_review": False,
+            "review_feedback": None,
+            "speculative_summaries": None,
+            "degradations": ["skipped_audit"],
+            "current_step": "consistency_auditor_and_cite",
+        }
+
     # Audit the consistency of the generated verdict
-    chain = consistency_auditor_and_cite_prompt | llm | JsonOutputParser()
+    chain = (
+        consistency_auditor_and_cite_prompt | get_llm(NODE_NAME) | JsonOutputParser()
+    )
+
+    # Most drafts pass the audit, so start finalize's summaries alongside it
+    summaries = asyncio.create_task(summarise_verdict(state))
     try:
-        audit = chain.invoke({"draft": draft, "count": citations, "risks": risks})
+        audit = await chain.ainvoke(
+            {"draft": draft, "count": citations, "risks": risks}
+        )
         needs_review = (
             audit.get("contradiction_score", 0) > 50
             or audit.get("confidence", 100) < 50
         )
+
+        # Another pass is pointless once a review no longer improves the draft
+        previous_score = state.get("consistency_score")
+        if (
+            needs_review
+            and state.get("review_count", 0) > 0
+            and previous_score is not None
+            and audit.get("confidence", 0) <= previous_score
+        ):
+            print(
+                f"Review stopped: consistency {audit.get('confidence', 0)} did not improve on {previous_score}"
+            )
+            needs_review = False
+        review_count = state.get("review_count", 0) + (1 if needs_review else 0)
+    except Exception as e:
+        print(f"Audit error: {e}")
+        audit, needs_review, review_count = None, False, state.get("review_count", 0)
+
+    # A retry produces a new draft, so its summaries would be wasted
+    if needs_review and review_count < state.get("max_review_count", 2):
+        summaries.cancel()
+        speculative_summaries = None
+    else:
+        try:
+            speculative_summaries = await summaries
+        except Exception as e:
+            print(f"Speculative summaries failed: {e}")
+            speculative_summaries = None
+
+    if audit is None:
         return {
-            "citations": citations,
-            "consistency_score": audit.get("confidence", 0),
-            "needs_review": needs_review,
-            "review_count": state.get("review_count", 0) + (1 if needs_review else 0),
+            "needs_review": False,
+            "speculative_summaries": speculative_summaries,
             "current_step": "consistency_auditor_and_cite",
         }
-    except Exception as e:
-        print(f"Audit error: {e}")
-        return {"needs_review": False, "current_step": "consistency_auditor_and_cite"}
+    return {
+        "citations": citations,
+        "consistency_score": audit.get("confidence", 0),
+        "needs_review": needs_review,
+        "review_count": review_count,
+        "review_feedback": review_issues(audit) if needs_review else None,
+        "speculative_summaries": speculative_summaries,
+        "current_step": "consistency_auditor_and_cite",
+    }
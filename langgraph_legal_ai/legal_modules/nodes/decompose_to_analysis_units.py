@@ -1,13 +1,16 @@
+import asyncio
+
 # LangChain / LangGraph Core
 from langchain_core.output_parsers import JsonOutputParser
 from legal_modules.node_helpers import *
 from legal_modules.prompts import *
-from legal_modules.setup import llm
+from legal_modules.setup import get_llm
+from legal_modules.speculation import speculative_retrieve
 from legal_modules.state import AgentState
 
 
 #  2. Decomposition
-def decompose_to_analysis_units(state: AgentState) -> dict:
+async def decompose_to_analysis_units(state: AgentState) -> dict:
     """
     Decompose the input query to analysis units.
     - Classify Intent.
@@ -31,10 +34,17 @@ def decompose_to_analysis_units(state: AgentState) -> dict:
     chats = state.get("messages", [])
     result = {}
 
+    # Start retrieving for the raw query while the LLM optimises it; the retriever reuses it if the query barely changes
+    speculation = asyncio.create_task(
+        asyncio.to_thread(speculative_retrieve, input_query)
+    )
+
     # Optimise the query, classify intent, and generate actions needed to simplify further process
     try:
-        chain = decompose_to_analysis_units_prompt | llm | JsonOutputParser()
-        result = chain.invoke(
+        chain = (
+            decompose_to_analysis_units_prompt | get_llm(NODE_NAME) | JsonOutputParser()
+        )
+        result = await chain.ainvoke(
             {
                 "input_query": input_query,
                 "chats": chats,
@@ -44,6 +54,7 @@ def decompose_to_analysis_units(state: AgentState) -> dict:
         )
 
         if not result.get("query_related_to_legal_context", True):
+            speculation.cancel()
             return {
                 "user_query": input_query,
                 "intent_classification": result,
@@ -56,17 +67,65 @@ def decompose_to_analysis_units(state: AgentState) -> dict:
         print(f"Intent classification failed: {e}")
         intent = "general" if not has_document else "document_general"
 
+    user_query = result.get("optimised_query")
+
+    # Reuse the verdict of a semantically identical earlier question if there is one
+    try:
+        cached = await asyncio.to_thread(
+            lookup_cached_answer, state, user_query, intent
+        )
+    except Exception as e:
+        print(f"Answer cache lookup failed: {e}")
+        cached = None
+    if cached:
+        print("Answer cache hit")
+        speculation.cancel()
+        return {
+            "user_query": user_query,
+            "analysis_units": [user_query],
+            "intent_classification": result or {"intent": intent},
+            "draft_verdict": cached["draft_verdict"],
+            "citations": cached["citations"],
+            # The audit does not run again, so the score is the cached run's
+            "consistency_score": cached.get("consistency_score"),
+            "answer_cache_hit": True,
+            "current_step": "decompose_to_analysis_units",
+            "actions_needed": [],
+        }
+
     # Generate Analysis Units
-    analysis_units = get_analysis_units(
-        result, intent, document_text, state.get("user_doc_collection")
+    analysis_units = await asyncio.to_thread(
+        get_analysis_units,
+        result,
+        intent,
+        document_text,
+        state.get("user_doc_collection"),
     )
-    user_query = result.get("optimised_query")
     actions_needed = result.get("actions_needed", [])
 
+    try:
+        speculative_retrieval = await speculation
+    except Exception as e:
+        print(f"Speculative retrieval failed: {e}")
+        speculative_retrieval = None
+
     return {
         "user_query": user_query,
         "analysis_units": analysis_units,
         "intent_classification": result if "result" in locals() else {"intent": intent},
+        "answer_cache_hit": False,
+        "speculative_retrieval": speculative_retrieval,
+        # A new question starts a new review loop
+        "review_count": 0,
+        "review_feedback": None,
+        "consistency_score": None,
+        "stage_fingerprints": None,
+        # and the analysis of the previous question must not leak into its answer
+        "doctrinal_analysis": None,
+        "loophole_analysis": None,
+        "precedent_matches": None,
+        "risk_assessment": None,
+        "remediation_suggestions": None,
         "current_step": "decompose_to_analysis_units",
         "actions_needed": actions_needed,
     }
@@ -1,23 +1,29 @@
+import asyncio
+
 from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage
+from langchain_core.runnables import RunnableConfig
+from legal_modules.deadline import should_degrade
+
 # LangChain / LangGraph Core
-from langchain_core.output_parsers import StrOutputParser
 from legal_modules.node_helpers import *
 from legal_modules.prompts import *
-from legal_modules.setup import llm
 from legal_modules.state import AgentState
 
 
 #  10. Finalize Response
-def finalize_and_summarise_response(state: AgentState) -> dict:
+async def finalize_and_summarise_response(
+    state: AgentState, config: RunnableConfig
+) -> dict:
     """
     Finalizes the response by adding references and a summary of the verdict.
     If the chat history is too long, it summarizes the chat history.
 
     Parameters:
     state (AgentState): The current state of the agent.
+    config (RunnableConfig): The run config, carries the request deadline.
 
     Returns:
-    dict: A dictionary containing the final response, the current step, and the messages to remove and add.
+    dict: A dictionary containing the final response, the spoken summary, the current step, and the messages to remove and add.
     """
 
     NODE_NAME = "finalize_and_summarise_response"
@@ -25,7 +31,6 @@ def finalize_and_summarise_response(state: AgentState) -> dict:
 
     verdict = state.get("draft_verdict", "")
     citations = state.get("citations", [])
-    messages = state.get("messages", [])
 
     # Format the references and add them to the response
     ref_text = (
@@ -37,22 +42,36 @@ def finalize_and_summarise_response(state: AgentState) -> dict:
 
     response = f"{verdict}\n{ref_text}\n\n\n*AI-generated legal analysis.*"
 
-    # Summarize the verdict and chat history to reduce the Token consuption in future calls
-    summarise_verdict_chain = summarise_verdict_prompt | llm | StrOutputParser()
-    verdict_summary = summarise_verdict_chain.invoke({"verdict": verdict})
-    removemessages = []
+    # Summaries of the verdict (for the chat history and for voice replies) and of a long chat history,
+    # to reduce the Token consuption in future calls. The auditor usually started them already.
+    degradations = []
+    summaries = state.get("speculative_summaries")
+    if summaries and summaries.get("key") == summary_key(state):
+        print("Reusing summaries computed during the audit")
+    else:
+        # Close to the deadline, the chat history is left for a later turn to summarise
+        include_chat_summary = not should_degrade(config, "skipped_chat_summary")
+        if not include_chat_summary:
+            degradations.append("skipped_chat_summary")
+        summaries = await summarise_verdict(state, include_chat_summary)
 
-    if len(messages) > 6:
-        summarise_chat_chain = summarise_chat_prompt | llm | StrOutputParser()
-        summary_chat = summarise_chat_chain.invoke({"chat_history": messages})
+    removemessages = []
+    if summaries["chat_summary"]:
         removemessages = [
             RemoveMessage(id=str(msg.id)) for msg in state["messages"]
-        ] + [AIMessage(summary_chat)]
+        ] + [AIMessage(summaries["chat_summary"])]
+
+    # Remember the verdict for semantically identical future questions, unless it was cut short
+    if not state.get("degradations"):
+        await asyncio.to_thread(store_cached_answer, state)
 
     print("COMPLETED")
     return {
         "final_response": response,
+        "voice_summary": summaries["voice_summary"],
+        "speculative_summaries": None,
+        "degradations": degradations,
         "current_step": "finalize_response",
         "messages": removemessages
-        + [HumanMessage(state["user_query"]), AIMessage(verdict_summary.strip())],
+        + [HumanMessage(state["user_query"]), AIMessage(summaries["verdict_summary"])],
     }
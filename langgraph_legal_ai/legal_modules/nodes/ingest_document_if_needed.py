@@ -1,10 +1,12 @@
+import asyncio
+
 from langchain_community.document_loaders import PyMuPDFLoader
 from legal_modules.node_helpers import *
 from legal_modules.state import AgentState
 
 
 #  1. Ingestion
-def ingest_document_if_needed(state: AgentState) -> dict:
+async def ingest_document_if_needed(state: AgentState) -> dict:
     """
     Ingest document if needed.
 
@@ -34,7 +36,7 @@ def ingest_document_if_needed(state: AgentState) -> dict:
 
     try:
         loader = PyMuPDFLoader(document_path)
-        docs = loader.load()
+        docs = await asyncio.to_thread(loader.load)
         document_text = "".join(doc.page_content for doc in docs)
     except Exception as e:
         return {
@@ -42,8 +44,10 @@ def ingest_document_if_needed(state: AgentState) -> dict:
             "current_step": "ingest_document_if_needed",
         }
 
-    # Chunking & Embedding
-    collection_name = chunk_and_save_to_chromadb(document_text, document_path)
+    # Chunking & Embedding (skipped if the same content was ingested before)
+    collection_name = await asyncio.to_thread(
+        ingest_user_document, document_text, document_path
+    )
 
     return {
         "document_text": document_text,
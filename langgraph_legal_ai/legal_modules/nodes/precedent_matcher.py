@@ -1,17 +1,20 @@
 # LangChain / LangGraph Core
+from langchain_core.runnables import RunnableConfig
+from legal_modules.deadline import should_degrade
 from legal_modules.node_helpers import *
 from legal_modules.prompts import *
 from legal_modules.state import AgentState
 
 
 #  5. Precedent Matcher
-def precedent_matcher(state: AgentState) -> dict:
+async def precedent_matcher(state: AgentState, config: RunnableConfig) -> dict:
     """
     Finds relevant precedents for the user query from the database of legal cases.
     If needed external resources ( web search ) are used to find relevant precedents.
 
     Parameters:
     state (AgentState): The current state of the agent.
+    config (RunnableConfig): The run config, carries the request deadline.
 
     Returns:
     dict: A dictionary containing the relevant precedents, the current step, and the status of different nodes.
@@ -35,14 +38,29 @@ def precedent_matcher(state: AgentState) -> dict:
 
     local_case_context = ""
     if local_case_docs:
-        local_case_context = "\n\n".join(
-            [
-                f"Case: {d.metadata['case_name']}\n{d.page_content.strip()}"
-                for d in local_case_docs
-            ]
+        local_case_context = pack_documents(
+            local_case_docs,
+            NODE_NAME,
+            lambda d: f"Case: {d.metadata['case_name']}\n{d.page_content.strip()}",
         )
     else:
         local_case_context = "No local cases found in the vector database."
 
+    # A review pass that found no new cases keeps the earlier matches
+    stage_fingerprint = fingerprint(user_query, local_case_context)
+    if state.get("precedent_matches") and reuse_stage(
+        state, NODE_NAME, stage_fingerprint
+    ):
+        return {"precedent_done": True}
+
     # Use web search if no relevant precedents are found and Find the precedents related to the user query
-    return match_precedent(user_query, messages, local_case_context)
+    # Close to the deadline, match against the local cases only
+    skip_web_search = should_degrade(config, "skipped_web_search")
+    result = await match_precedent(
+        user_query, messages, local_case_context, allow_web_search=not skip_web_search
+    )
+    if skip_web_search:
+        result["degradations"] = ["skipped_web_search"]
+    elif result["precedent_matches"]:
+        result["stage_fingerprints"] = {NODE_NAME: stage_fingerprint}
+    return result
@@ -1,16 +1,22 @@
+import asyncio
+
 # LangChain / LangGraph Core
+from langchain_core.runnables import RunnableConfig
+from legal_modules.deadline import REDUCED_RETRIEVAL_K, should_degrade
 from legal_modules.node_helpers import *
 from legal_modules.setup import db
+from legal_modules.speculation import reuse_speculative_docs
 from legal_modules.state import AgentState
 
 
 #  3. Retriever
-def retriever(state: AgentState) -> dict:
+async def retriever(state: AgentState, config: RunnableConfig) -> dict:
     """
     Retrieves relevant documents from the database based on the user query and analysis units.
 
     Parameters:
     state (AgentState): The current state of the agent.
+    config (RunnableConfig): The run config, carries the request deadline.
 
     Returns:
     dict: A dictionary containing the retrieved documents, the current step, and the status of different nodes.
@@ -21,13 +27,47 @@ def retriever(state: AgentState) -> dict:
     # Reterive the relevent documents from the Chroma DB to optimise the answer
     query = state["user_query"]
     analysis_units = state.get("analysis_units", [])
-    unique_docs = get_relevant_docs(query, analysis_units, db)
+
+    # Close to the deadline, fewer chunks per query keep the downstream prompts short
+    degradations = []
+    k = 5
+    if should_degrade(config, "reduced_retrieval"):
+        degradations.append("reduced_retrieval")
+        k = REDUCED_RETRIEVAL_K
+
+    # A review pass asks the same queries again, so reuse what they returned
+    retrieval_fingerprint = fingerprint(query, analysis_units)
+    if state.get("retrieved_docs") and reuse_stage(
+        state, NODE_NAME, retrieval_fingerprint
+    ):
+        unique_docs = state["retrieved_docs"]
+    else:
+        # Docs retrieved for the raw query while it was being decomposed, reused if it barely changed
+        prefetched_docs = await asyncio.to_thread(
+            reuse_speculative_docs, state.get("speculative_retrieval"), query
+        )
+        unique_docs = await asyncio.to_thread(
+            get_relevant_docs, query, analysis_units, db, prefetched_docs, k
+        )
+
+    # Search for the issues the auditor raised, so the review pass has new material
+    review_feedback = state.get("review_feedback") or []
+    if review_feedback:
+        print(f"Retrieving for {len(review_feedback)} review issues")
+        unique_docs = await asyncio.to_thread(
+            get_relevant_docs, query, review_feedback, db, unique_docs, k
+        )
 
     return {
         "retrieved_docs": unique_docs,
+        "speculative_retrieval": None,
+        # Reduced results are not reused by a review pass
+        "stage_fingerprints": {
+            NODE_NAME: None if degradations else retrieval_fingerprint
+        },
+        "degradations": degradations,
         "current_step": "retriever",
         "doctrinal_done": False,
         "precedent_done": False,
         "remediation_done": False,
-        "parallel_join_complete": False,
     }
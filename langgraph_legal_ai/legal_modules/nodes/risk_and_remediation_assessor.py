@@ -2,12 +2,12 @@
 from langchain_core.output_parsers import JsonOutputParser
 from legal_modules.node_helpers import *
 from legal_modules.prompts import *
-from legal_modules.setup import llm
+from legal_modules.setup import get_llm
 from legal_modules.state import AgentState
 
 
 #  6. Risk & Remediation Assessor
-def risk_and_remediation_assessor(state: AgentState) -> dict:
+async def risk_and_remediation_assessor(state: AgentState) -> dict:
     """
     Assesses the risk associated with the user query and provides remediation suggestions to mitigate the risk.
 
@@ -31,7 +31,7 @@ def risk_and_remediation_assessor(state: AgentState) -> dict:
         }
 
     doctrinal = state.get("doctrinal_analysis", {})
-    loopholes = state.get("loophole_analysis", {}).get("loopholes", [])
+    loopholes = (state.get("loophole_analysis") or {}).get("loopholes", [])
 
     # Check if there are any issues
     issues = []
@@ -53,12 +53,22 @@ def risk_and_remediation_assessor(state: AgentState) -> dict:
             "remediation_done": True,
         }
 
+    # Unchanged issues lead to the same assessment
+    stage_fingerprint = fingerprint(issues)
+    if state.get("risk_assessment") and reuse_stage(
+        state, NODE_NAME, stage_fingerprint
+    ):
+        return {"remediation_done": True}
+
     # Assess the risks and Generate remediation suggestions
-    chain = risk_and_remediation_assessor_prompt | llm | JsonOutputParser()
+    chain = (
+        risk_and_remediation_assessor_prompt | get_llm(NODE_NAME) | JsonOutputParser()
+    )
 
     try:
-        result = chain.invoke({"issues": "\n".join(issues)})
+        result = await chain.ainvoke({"issues": "\n".join(issues)})
         result["remediation_done"] = True
+        result["stage_fingerprints"] = {NODE_NAME: stage_fingerprint}
         return result
     except Exception as e:
         print(f"Error in risk node: {e}")
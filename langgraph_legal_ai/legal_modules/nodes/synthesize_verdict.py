@@ -2,12 +2,12 @@
 from langchain_core.output_parsers import StrOutputParser
 from legal_modules.node_helpers import *
 from legal_modules.prompts import *
-from legal_modules.setup import llm
+from legal_modules.setup import get_llm
 from legal_modules.state import AgentState
 
 
 #  8. Synthesize Verdict
-def synthesize_verdict(state: AgentState) -> dict:
+async def synthesize_verdict(state: AgentState) -> dict:
     """
     A node that synthesizes a verdict based on the user query, doctrinal analysis, risk assessment, precedent matches, remediation suggestions, and previous chat messages.
 
@@ -30,10 +30,10 @@ def synthesize_verdict(state: AgentState) -> dict:
     messages = state.get("messages", [])
 
     # Synthesize the verdict using the available Data
-    chain = synthesis_verdict_prompt | llm | StrOutputParser()
+    chain = synthesis_verdict_prompt | get_llm(NODE_NAME) | StrOutputParser()
 
     try:
-        verdict = chain.invoke(
+        verdict = await chain.ainvoke(
             {
                 "user_query": user_query,
                 "doct_analysis": doctrinal,
@@ -42,6 +42,7 @@ def synthesize_verdict(state: AgentState) -> dict:
                 "remediations": remediation,
                 "previous_chats": messages,
                 "analysis_units": analysis_units,
+                "review_feedback": state.get("review_feedback") or "None",
             }
         )
         return {"draft_verdict": verdict, "current_step": "synthesize_verdict"}
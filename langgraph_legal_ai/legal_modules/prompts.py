@@ -199,6 +199,7 @@ Risks: {risks}
 Precedents: {precedents}
 Loopholes: {remediations}
 Previous Chats : {previous_chats}
+Reviewer Feedback on the previous draft (address every point, if any): {review_feedback}
 
 Synthesize a legal verdict. Use Markdown. Be concise.
 Include sections: Overall Verdict, Clause by clause analysis(if needed), Key Risks, Recommendation, Precedent cases.
@@ -222,7 +223,7 @@ consistency_auditor_and_cite_prompt = ChatPromptTemplate.from_messages(
 Risks: {risks}
 Citations found: {count}
 
-Return JSON: {{"contradiction_score": int (0-100), "confidence": int (0-100)}}""",
+Return JSON: {{"contradiction_score": int (0-100), "confidence": int (0-100), "issues": ["each contradiction or unsupported claim in the draft, as a short legal search query"]}}""",
         ),
     ]
 )
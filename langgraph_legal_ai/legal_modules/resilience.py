@@ -0,0 +1,239 @@
+#
+# Timeouts, Retries and Hedged LLM Requests
+#
+
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Optional
+
+import openai
+from langchain_openai import ChatOpenAI
+from legal_modules.context_packer import count_tokens
+from legal_modules.governor import llm_governor
+
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "3"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "8"))
+# Hedging needs this many observed latencies of a node before it can pick a delay
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_HEDGE_QUANTILE = float(os.getenv("LLM_HEDGE_QUANTILE", "0.95"))
+# Completion size assumed for the rate governor when a node sets no max_tokens
+ESTIMATED_COMPLETION_TOKENS = 1024
+
+RETRYABLE_ERRORS = (
+    asyncio.TimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+class AttemptStats:
+    """Latencies of recent successful LLM attempts and retry/hedge counts, per node."""
+
+    def __init__(self, window: int = 200):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(lambda: deque(maxlen=window))
+        self.counts = defaultdict(lambda: defaultdict(int))
+
+    def record(self, node_name: str, latency: float):
+        with self.lock:
+            self.latencies[node_name].append(latency)
+
+    def count(self, node_name: str, event: str):
+        with self.lock:
+            self.counts[node_name][event] += 1
+
+    def quantile(self, node_name: str, q: float) -> Optional[float]:
+        """Return the q-quantile of recent latencies, or None while there are too few samples."""
+        with self.lock:
+            samples = sorted(self.latencies[node_name])
+        if len(samples) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(int(q * len(samples)), len(samples) - 1)]
+
+    def metrics(self) -> dict:
+        with self.lock:
+            nodes = set(self.latencies) | set(self.counts)
+        return {
+            node_name: {
+                **dict(self.counts[node_name]),
+                "hedge_delay_s": self.quantile(node_name, LLM_HEDGE_QUANTILE),
+            }
+            for node_name in nodes
+        }
+
+
+attempt_stats = AttemptStats()
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter for the given (1-based) failed attempt."""
+    return random.uniform(
+        0, min(LLM_RETRY_MAX_DELAY, LLM_RETRY_BASE_DELAY * 2 ** (attempt - 1))
+    )
+
+
+def retry_after(error: openai.RateLimitError) -> float:
+    """Return the Retry-After seconds of a 429 response, or None."""
+    try:
+        return float(error.response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class ResilientChatOpenAI(ChatOpenAI):
+    """
+    ChatOpenAI with a per-attempt timeout, bounded retries with jittered backoff and optional hedging.
+
+    With `hedge` enabled, a second identical request is sent once the first has been running
+    longer than the node's recent p95 latency, and whichever answers first is used.
+    Every attempt, streamed or not, waits for a slot from the process-wide `llm_governor`; the timeout
+    starts once it has one, and a streamed attempt holds the slot until its last chunk.
+
+    Both async paths are wrapped. LangChain streams the call instead of `_agenerate` whenever a
+    streaming callback is attached, as with the graph's `stream_mode="messages"`. A streamed
+    attempt applies the timeout to every chunk and is only retried while no chunk has reached the
+    caller yet; it is never hedged.
+    """
+
+    node_name: str = "default"
+    attempt_timeout: Optional[float] = None
+    max_attempts: int = LLM_MAX_ATTEMPTS
+    hedge: bool = False
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                return await self._hedged_attempt(messages, stop, run_manager, **kwargs)
+            except RETRYABLE_ERRORS as e:
+                event = "timeouts" if isinstance(e, asyncio.TimeoutError) else "errors"
+                attempt_stats.count(self.node_name, event)
+                if attempt == self.max_attempts:
+                    raise
+
+                delay = backoff_delay(attempt)
+                attempt_stats.count(self.node_name, "retries")
+                print(
+                    f"LLM [{self.node_name}] attempt {attempt} failed ({type(e).__name__}), "
+                    f"retrying in {delay:.2f}s"
+                )
+                await asyncio.sleep(delay)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        for attempt in range(1, self.max_attempts + 1):
+            streamed = False
+            try:
+                async for chunk in self._stream_attempt(
+                    messages, stop, run_manager, **kwargs
+                ):
+                    streamed = True
+                    yield chunk
+                return
+            except RETRYABLE_ERRORS as e:
+                event = "timeouts" if isinstance(e, asyncio.TimeoutError) else "errors"
+                attempt_stats.count(self.node_name, event)
+                # Chunks the caller already has cannot be taken back
+                if streamed or attempt == self.max_attempts:
+                    raise
+
+                delay = backoff_delay(attempt)
+                attempt_stats.count(self.node_name, "retries")
+                print(
+                    f"LLM [{self.node_name}] streamed attempt {attempt} failed ({type(e).__name__}), "
+                    f"retrying in {delay:.2f}s"
+                )
+                await asyncio.sleep(delay)
+
+    async def _stream_attempt(self, messages, stop, run_manager, **kwargs):
+        estimated_tokens = self._estimate_tokens(messages)
+        used_tokens = 0
+        async with llm_governor.slot(self.node_name, estimated_tokens):
+            started = time.perf_counter()
+            chunks = ChatOpenAI._astream(self, messages, stop, run_manager, **kwargs)
+            try:
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(
+                            anext(chunks), self.attempt_timeout
+                        )
+                    except StopAsyncIteration:
+                        break
+                    except openai.RateLimitError as e:
+                        llm_governor.backoff(retry_after(e))
+                        raise
+                    usage = getattr(chunk.message, "usage_metadata", None) or {}
+                    used_tokens += usage.get("total_tokens", 0)
+                    yield chunk
+            finally:
+                await chunks.aclose()
+        attempt_stats.record(self.node_name, time.perf_counter() - started)
+        llm_governor.settle(estimated_tokens, used_tokens)
+
+    def _estimate_tokens(self, messages) -> int:
+        return sum(count_tokens(str(m.content)) for m in messages) + (
+            self.max_tokens or ESTIMATED_COMPLETION_TOKENS
+        )
+
+    async def _attempt(self, messages, stop, run_manager, **kwargs):
+        estimated_tokens = self._estimate_tokens(messages)
+        async with llm_governor.slot(self.node_name, estimated_tokens):
+            started = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(
+                    ChatOpenAI._agenerate(self, messages, stop, run_manager, **kwargs),
+                    self.attempt_timeout,
+                )
+            except openai.RateLimitError as e:
+                llm_governor.backoff(retry_after(e))
+                raise
+        attempt_stats.record(self.node_name, time.perf_counter() - started)
+        llm_governor.settle(
+            estimated_tokens,
+            ((result.llm_output or {}).get("token_usage") or {}).get("total_tokens", 0),
+        )
+        return result
+
+    async def _hedged_attempt(self, messages, stop, run_manager, **kwargs):
+        hedge_delay = (
+            attempt_stats.quantile(self.node_name, LLM_HEDGE_QUANTILE)
+            if self.hedge
+            else None
+        )
+        if hedge_delay is None:
+            return await self._attempt(messages, stop, run_manager, **kwargs)
+
+        primary = asyncio.create_task(
+            self._attempt(messages, stop, run_manager, **kwargs)
+        )
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=hedge_delay)
+            if done:
+                return primary.result()
+
+            attempt_stats.count(self.node_name, "hedges")
+            backup = asyncio.create_task(
+                self._attempt(messages, stop, run_manager, **kwargs)
+            )
+            pending.add(backup)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is backup:
+                            attempt_stats.count(self.node_name, "hedges_won")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # The slower request is no longer needed, and neither is anything left on cancellation
+            for task in pending:
+                task.cancel()
@@ -0,0 +1,25 @@
+#
+# Structured Output Schemas
+#
+
+from typing import List
+
+from pydantic import BaseModel, Field
+
+
+class PrecedentMatch(BaseModel):
+    """A precedent relevant to the user query."""
+
+    case_name: str = Field(description="Name of the case.")
+    relevance_score: str = Field(
+        description="How relevant the case is: high or medium."
+    )
+    matching_principle: str = Field(
+        description="The legal principle the case shares with the query."
+    )
+
+
+class PrecedentMatches(BaseModel):
+    """The top precedents for the user query."""
+
+    matches: List[PrecedentMatch] = Field(description="At most 3 precedents.")
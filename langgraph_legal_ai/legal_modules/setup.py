@@ -2,36 +2,195 @@
 # 2. CONFIGURATION & INITIALIZATION
 #
 
+import json
 import os
+from pathlib import Path
+from typing import List
 
 # Environment & Models
 from dotenv import load_dotenv
 from langchain_chroma import Chroma
+from langchain_core.embeddings import Embeddings
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_openai import ChatOpenAI
-# Langfuse 
+
+# Langfuse
 from langfuse import Langfuse
 from langfuse.langchain import CallbackHandler
+from legal_modules.llm_cache import SQLiteLLMCache
+from legal_modules.metrics import llm_metrics
+from legal_modules.resilience import ResilientChatOpenAI, attempt_stats
+from legal_modules.timing import timed
 
 load_dotenv()
 
+# Data directories resolved against the package so the graph also works when imported from another service.
+# LEGAL_DATA_DIR moves them elsewhere, e.g. to a scratch directory for tests and benchmarks.
+BASE_DIR = Path(os.getenv("LEGAL_DATA_DIR") or Path(__file__).resolve().parent.parent)
+CHROMA_DIR = str(BASE_DIR / "chroma")
+USER_DOCS_DIR = str(BASE_DIR / "user-docs")
+CHECKPOINT_DB = str(BASE_DIR / "db" / "checkpoints.sqlite")
+# Where the API server stores uploads under their content hash (see save_upload in fastapi_legal.py)
+UPLOAD_DIR = str(
+    os.getenv("LEGAL_UPLOAD_DIR")
+    or Path(__file__).resolve().parent.parent.parent / "user_uploaded_pdfs"
+)
+
 #  LLM & Embeddings
-llm = ChatOpenAI(
-    model="gpt-oss-20b",
-    temperature=0.7,
-    openai_api_base="https://Fyra.im/v1",
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://Fyra.im/v1")
+
+# Model tiers: a fast model for classification and summaries, a strong model for legal reasoning
+MODEL_TIERS = {
+    "fast": {
+        "model": os.getenv("LLM_FAST_MODEL", "gpt-oss-20b"),
+        "temperature": 0.3,
+        "max_tokens": None,
+    },
+    "strong": {
+        "model": os.getenv("LLM_STRONG_MODEL", "gpt-oss-20b"),
+        "temperature": 0.7,
+        "max_tokens": None,
+    },
+}
+
+# Seconds one LLM request may take before it is abandoned and retried
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+
+# Model settings of every node: a tier plus optional overrides of model, temperature, max_tokens and timeout
+NODE_MODELS = {
+    "decompose_to_analysis_units": {"tier": "fast", "temperature": 0, "timeout": 30},
+    "compliance_and_loophole_validator": {"tier": "strong", "temperature": 0.2},
+    "precedent_matcher": {"tier": "strong", "temperature": 0.2},
+    "risk_and_remediation_assessor": {
+        "tier": "fast",
+        "temperature": 0.2,
+        "timeout": 30,
+    },
+    "synthesize_verdict": {"tier": "strong", "timeout": 90},
+    "consistency_auditor_and_cite": {"tier": "strong", "temperature": 0},
+    "finalize_and_summarise_response": {
+        "tier": "fast",
+        "max_tokens": 1024,
+        "timeout": 30,
+    },
+    "chain_summariser": {"tier": "fast", "max_tokens": 1024, "timeout": 30},
+}
+# e.g. LLM_NODE_MODELS='{"synthesize_verdict": {"model": "gpt-oss-120b", "max_tokens": 4096}}'
+for node, overrides in json.loads(os.getenv("LLM_NODE_MODELS", "{}")).items():
+    NODE_MODELS.setdefault(node, {}).update(overrides)
+
+# Nodes that send a second, hedged request when the first is slower than their p95 latency
+LLM_HEDGE_NODES = {
+    node.strip() for node in os.getenv("LLM_HEDGE_NODES", "").split(",") if node.strip()
+}
+
+
+def create_llm(
+    tier: str = "strong", timeout: float = LLM_TIMEOUT, **overrides
+) -> ChatOpenAI:
+    """
+    Creates a chat model from a tier of MODEL_TIERS.
+    Requests time out after `timeout` seconds and are retried with jittered backoff by the model itself.
+
+    Parameters:
+    tier (str): The model tier, "fast" or "strong".
+    timeout (float): Seconds a single request may take.
+    **overrides: model, temperature or max_tokens replacing the tier defaults, and other ChatOpenAI arguments.
+
+    Returns:
+    ChatOpenAI: The chat model.
+    """
+    settings = {**MODEL_TIERS[tier], **overrides}
+    return ResilientChatOpenAI(
+        openai_api_base=LLM_BASE_URL,
+        attempt_timeout=timeout,
+        timeout=timeout,
+        # Retries are handled by ResilientChatOpenAI so they are bounded, jittered and counted
+        max_retries=0,
+        **settings,
+    )
+
+
+#  LLM Response Cache
+LLM_CACHE_DB = str(BASE_DIR / "db" / "llm_cache.sqlite")
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Nodes whose LLM calls are served from the cache
+LLM_CACHE_NODES = {
+    node.strip()
+    for node in os.getenv(
+        "LLM_CACHE_NODES",
+        "decompose_to_analysis_units,compliance_and_loophole_validator,"
+        "precedent_matcher,risk_and_remediation_assessor,consistency_auditor_and_cite",
+    ).split(",")
+    if node.strip()
+}
+# Force temperature 0 on cached nodes so a cached answer is also the answer a fresh call would give
+LLM_CACHE_DETERMINISTIC = (
+    os.getenv("LLM_CACHE_DETERMINISTIC", "false").lower() == "true"
 )
 
-embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+llm_cache = SQLiteLLMCache(LLM_CACHE_DB, LLM_CACHE_MAX_BYTES)
+node_llms = {}
+
+
+def get_llm(node_name: str) -> ChatOpenAI:
+    """
+    Returns the chat model a node should call, configured from NODE_MODELS.
+    Nodes in LLM_CACHE_NODES are backed by the persistent LLM cache, and every call
+    is recorded per node in `llm_metrics`.
+
+    Parameters:
+    node_name (str): The name of the calling node.
+
+    Returns:
+    ChatOpenAI: The chat model for the node.
+    """
+    if node_name not in node_llms:
+        settings = dict(NODE_MODELS.get(node_name, {}))
+        tier = settings.pop("tier", "strong")
+        if node_name in LLM_CACHE_NODES:
+            settings["cache"] = llm_cache
+            if LLM_CACHE_DETERMINISTIC:
+                settings["temperature"] = 0
+
+        model = settings.get("model", MODEL_TIERS[tier]["model"])
+        settings["callbacks"] = [llm_metrics.handler(node_name, model)]
+        settings["node_name"] = node_name
+        settings["hedge"] = node_name in LLM_HEDGE_NODES
+        node_llms[node_name] = create_llm(tier, **settings)
+    return node_llms[node_name]
+
+
+class TimedEmbeddings(Embeddings):
+    """Times every embedding batch of the wrapped embedding model."""
+
+    def __init__(self, model: Embeddings):
+        self.model = model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with timed("embedding", "documents"):
+            return self.model.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        with timed("embedding", "query"):
+            return self.model.embed_query(text)
+
+
+embeddings = TimedEmbeddings(
+    HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+)
 
 #  Vector Store (Main Knowledge Base)
 db = Chroma(
-    persist_directory="./chroma",
+    persist_directory=CHROMA_DIR,
     embedding_function=embeddings,
     collection_name="legal",
 )
 print(f"Chroma DB initialized with {db._collection.count()} documents.")
 
+# Version of the knowledge base; cached answers are only reused within the same version
+CORPUS_VERSION = os.getenv("LEGAL_CORPUS_VERSION") or str(db._collection.count())
+
 #  Callbacks
 langfuse = Langfuse(
     secret_key=os.getenv("LANGFUSE_SECRET_KEY"),
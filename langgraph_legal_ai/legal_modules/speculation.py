@@ -0,0 +1,92 @@
+#
+# Speculative Retrieval
+#
+
+import os
+import time
+
+import numpy as np
+from legal_modules.setup import db, embeddings
+from legal_modules.utils import retrieve_filtered_documents
+
+# Minimum cosine similarity between the raw and the optimised query for the speculative docs to be reused
+SPECULATIVE_REUSE_THRESHOLD = float(os.getenv("SPECULATIVE_REUSE_THRESHOLD", "0.85"))
+
+
+class SpeculationStats:
+    """Counts how often speculative retrieval was reused and how much retrieval time it took off the critical path."""
+
+    def __init__(self):
+        self.started = 0
+        self.reused = 0
+        self.discarded = 0
+        self.saved_seconds = 0.0
+
+    def metrics(self) -> dict:
+        decided = self.reused + self.discarded
+        return {
+            "started": self.started,
+            "reused": self.reused,
+            "discarded": self.discarded,
+            "reuse_rate": round(self.reused / decided, 3) if decided else 0.0,
+            "saved_seconds": round(self.saved_seconds, 3),
+        }
+
+
+speculation_stats = SpeculationStats()
+
+
+def speculative_retrieve(input_query: str) -> dict:
+    """
+    Retrieves documents for the raw user query, meant to run while the query is still being decomposed.
+
+    Parameters:
+    input_query (str): The raw user query.
+
+    Returns:
+    dict: The query, its embedding, the retrieved documents and the seconds the retrieval took.
+    """
+    speculation_stats.started += 1
+    started = time.perf_counter()
+    docs = retrieve_filtered_documents(db, input_query, k=5, threshold=0.1)
+    return {
+        "query": input_query,
+        "embedding": embeddings.embed_query(input_query),
+        "docs": docs,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def reuse_speculative_docs(speculative: dict, user_query: str):
+    """
+    Returns the speculatively retrieved documents if the optimised query is close enough to the raw query.
+
+    Parameters:
+    speculative (dict): The result of speculative_retrieve, or None.
+    user_query (str): The optimised user query.
+
+    Returns:
+    list: The documents to use for `user_query`, or None if they have to be retrieved again.
+    """
+    if not speculative or not user_query:
+        return None
+
+    if user_query == speculative["query"]:
+        similarity = 1.0
+    else:
+        raw = np.asarray(speculative["embedding"], dtype=np.float32)
+        optimised = np.asarray(embeddings.embed_query(user_query), dtype=np.float32)
+        similarity = float(
+            np.dot(raw, optimised)
+            / ((np.linalg.norm(raw) * np.linalg.norm(optimised)) or 1.0)
+        )
+
+    if similarity < SPECULATIVE_REUSE_THRESHOLD:
+        speculation_stats.discarded += 1
+        print(f"Speculative retrieval discarded (similarity {similarity:.2f})")
+        return None
+
+    speculation_stats.reused += 1
+    speculation_stats.saved_seconds += speculative["seconds"]
+    print(f"Speculative retrieval reused (similarity {similarity:.2f})")
+    return speculative["docs"]
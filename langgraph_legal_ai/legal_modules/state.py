@@ -8,6 +8,20 @@ from typing import Annotated, Any, Dict, List, Optional, Sequence, TypedDict
 from langgraph.graph.message import BaseMessage, add_messages
 
 
+def add_degradations(current: Optional[list], update: Optional[list]) -> list:
+    """Collect the degradations applied by the nodes of a run. None resets them for a new run."""
+    if update is None:
+        return []
+    return (current or []) + [d for d in update if d not in (current or [])]
+
+
+def merge_fingerprints(current: Optional[dict], update: Optional[dict]) -> dict:
+    """Merge the input fingerprints reported by parallel nodes. None resets them for a new question."""
+    if update is None:
+        return {}
+    return {**(current or {}), **update}
+
+
 class AgentState(TypedDict):
     """
     The state of the agent.
@@ -17,6 +31,8 @@ class AgentState(TypedDict):
     input_query: str
     document_path: Optional[str]
     document_text: Optional[str]
+    # Whether the reply is spoken, so the finalize step also writes a voice summary
+    want_voice_summary: Optional[bool]
 
     # Processing
     user_query: str
@@ -25,6 +41,7 @@ class AgentState(TypedDict):
     retrieved_docs: List[Dict[str, Any]]
     user_doc_collection: Optional[str]
     intent_classification: Optional[Dict[str, Any]]
+    speculative_retrieval: Optional[Dict[str, Any]]
 
     # Agent Outputs
     doctrinal_analysis: Optional[Dict[str, Any]]
@@ -39,15 +56,25 @@ class AgentState(TypedDict):
     citations: Optional[List[Dict[str, Any]]]
     consistency_score: Optional[float]
     final_response: Optional[str]
+    voice_summary: Optional[str]
+    speculative_summaries: Optional[Dict[str, Any]]
 
     # Control Flow
     needs_review: bool
     doctrinal_done: Optional[bool]
     precedent_done: Optional[bool]
     remediation_done: Optional[bool]
-    parallel_join_complete: Optional[bool]
 
     review_count: int
     max_review_count: int
+    review_feedback: Optional[List[str]]
+    # Hash of the inputs each stage last ran with, so a review pass only re-runs what changed
+    stage_fingerprints: Annotated[Dict[str, str], merge_fingerprints]
     current_step: str
     error: Optional[str]
+    # Work skipped or reduced to meet the request deadline
+    degradations: Annotated[List[str], add_degradations]
+
+    # Answer Cache
+    bypass_answer_cache: Optional[bool]
+    answer_cache_hit: Optional[bool]
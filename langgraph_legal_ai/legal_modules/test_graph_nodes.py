@@ -9,7 +9,7 @@ from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage
 # LangChain / LangGraph Core
 from langchain_core.output_parsers import JsonOutputParser, StrOutputParser
 from legal_modules.node_helpers import *
-from legal_modules.setup import db, embeddings, llm
+from legal_modules.setup import create_llm, db, embeddings
 from legal_modules.state import AgentState
 from legal_modules.tools import web_search_tool, websearch_llm
 from legal_modules.utils import (get_user_doc_collection_name,
@@ -17,6 +17,8 @@ from legal_modules.utils import (get_user_doc_collection_name,
 
 from langgraph_legal_ai.legal_modules.prompts import *
 
+llm = create_llm("strong")
+
 
 #  1. Ingestion
 def ingest_document_if_needed(state: AgentState) -> dict:
@@ -418,6 +420,7 @@ def synthesize_verdict(state: AgentState) -> dict:
                 "remediations": remediation,
                 "previous_chats": messages,
                 "analysis_units": analysis_units,
+                "review_feedback": "None",
             }
         )
         return {"draft_verdict": verdict, "current_step": "synthesize_verdict"}
@@ -0,0 +1,169 @@
+#
+# Timing Instrumentation
+#
+
+import inspect
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+# Upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# Timings of the request being handled, set by collect_request_timings
+request_timings: ContextVar[Optional[list]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+class TimingRegistry:
+    """
+    Aggregates latency histograms, error counts and LLM token counts per (kind, name),
+    e.g. ("node", "retriever") or ("llm", "synthesize_verdict"), and renders them in the Prometheus text format.
+    """
+
+    def __init__(self, prefix: str = "legal_ai"):
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.buckets = defaultdict(lambda: [0] * len(BUCKETS))
+        self.sums = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.errors = defaultdict(int)
+        self.tokens = defaultdict(int)
+
+    def observe(self, kind: str, name: str, seconds: float, error: bool = False):
+        """Record one timed operation, also into the timings of the current request."""
+        key = (kind, name)
+        with self.lock:
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    self.buckets[key][i] += 1
+            self.sums[key] += seconds
+            self.counts[key] += 1
+            if error:
+                self.errors[key] += 1
+
+        entries = request_timings.get()
+        if entries is not None:
+            entries.append(
+                {
+                    "kind": kind,
+                    "name": name,
+                    "seconds": round(seconds, 4),
+                    "error": error,
+                }
+            )
+
+    def add_tokens(self, node_name: str, prompt_tokens: int, completion_tokens: int):
+        with self.lock:
+            self.tokens[(node_name, "prompt")] += prompt_tokens
+            self.tokens[(node_name, "completion")] += completion_tokens
+
+    def render(self) -> str:
+        """Return all metrics in the Prometheus text exposition format."""
+        duration = f"{self.prefix}_duration_seconds"
+        errors = f"{self.prefix}_errors_total"
+        tokens = f"{self.prefix}_llm_tokens_total"
+        lines = [
+            f"# HELP {duration} Latency of nodes, LLM calls, Chroma queries, embeddings and HTTP requests.",
+            f"# TYPE {duration} histogram",
+        ]
+        with self.lock:
+            for (kind, name), buckets in sorted(self.buckets.items()):
+                labels = f'kind="{kind}",name="{name}"'
+                for bound, count in zip(BUCKETS, buckets):
+                    lines.append(f'{duration}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(
+                    f'{duration}_bucket{{{labels},le="+Inf"}} {self.counts[(kind, name)]}'
+                )
+                lines.append(
+                    f"{duration}_sum{{{labels}}} {self.sums[(kind, name)]:.6f}"
+                )
+                lines.append(
+                    f"{duration}_count{{{labels}}} {self.counts[(kind, name)]}"
+                )
+
+            lines += [
+                f"# HELP {errors} Failed operations.",
+                f"# TYPE {errors} counter",
+            ]
+            for kind, name in sorted(self.counts):
+                lines.append(
+                    f'{errors}{{kind="{kind}",name="{name}"}} {self.errors[(kind, name)]}'
+                )
+
+            lines += [
+                f"# HELP {tokens} LLM tokens used per node.",
+                f"# TYPE {tokens} counter",
+            ]
+            for (node_name, token_type), count in sorted(self.tokens.items()):
+                lines.append(
+                    f'{tokens}{{node="{node_name}",type="{token_type}"}} {count}'
+                )
+        return "\n".join(lines) + "\n"
+
+
+timings = TimingRegistry()
+
+
+@contextmanager
+def timed(kind: str, name: str):
+    """Time the block as one (kind, name) operation. Exceptions are counted as errors and re-raised."""
+    started = time.perf_counter()
+    error = False
+    try:
+        yield
+    except BaseException:
+        error = True
+        raise
+    finally:
+        timings.observe(kind, name, time.perf_counter() - started, error)
+
+
+def timed_node(name: str, node):
+    """Wrap an async graph node so every run of it is timed. The run config is passed on to nodes that take one."""
+    takes_config = "config" in inspect.signature(node).parameters
+
+    # LangGraph passes the run config to a node by its `config` parameter name
+    async def wrapper(state, config):
+        with timed("node", name):
+            if takes_config:
+                return await node(state, config)
+            return await node(state)
+
+    wrapper.__name__ = node.__name__
+    wrapper.__doc__ = node.__doc__
+    return wrapper
+
+
+def collect_request_timings() -> list:
+    """Start collecting the timings of the current request (and the tasks it starts) into the returned list."""
+    entries = []
+    request_timings.set(entries)
+    return entries
+
+
+def summarise_request_timings(entries: list) -> dict:
+    """
+    Summarise the timings collected for one request.
+
+    Parameters:
+    entries (list): The list returned by collect_request_timings.
+
+    Returns:
+    dict: The total seconds and count per kind and the individual timings in order.
+    """
+    totals = defaultdict(lambda: {"seconds": 0.0, "count": 0})
+    for entry in entries:
+        totals[entry["kind"]]["seconds"] += entry["seconds"]
+        totals[entry["kind"]]["count"] += 1
+    return {
+        "totals": {
+            kind: {"seconds": round(total["seconds"], 4), "count": total["count"]}
+            for kind, total in totals.items()
+        },
+        "timings": list(entries),
+    }
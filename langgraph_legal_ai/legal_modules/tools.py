@@ -9,7 +9,7 @@ import requests
 from bs4 import BeautifulSoup
 from langchain.tools import tool
 from langchain_core.tools import tool
-from legal_modules.setup import llm
+from legal_modules.setup import get_llm
 
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 GOOGLE_CSE_ID = os.getenv("GOOGLE_CSE_ID")
@@ -94,4 +94,4 @@ def web_search_tool(query: str) -> dict:
     return google_search_and_fetch("site:indiankanoon.org " + query)
 
 
-websearch_llm = llm.bind_tools([web_search_tool])
+websearch_llm = get_llm("precedent_matcher").bind_tools([web_search_tool])
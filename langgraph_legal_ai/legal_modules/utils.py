@@ -6,23 +6,51 @@ from typing import List
 
 from langchain_chroma import Chroma
 from langchain_core.documents import Document
-from legal_modules.setup import embeddings
+from legal_modules.setup import UPLOAD_DIR, embeddings
+from legal_modules.timing import timed
 
 
-def get_user_doc_collection_name(doc_path: str) -> str:
-    """Generate a consistent hash-based collection name for user docs."""
+def file_content_hash(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Return the SHA-256 hex digest of a file's bytes.
+    The API server stores complete uploads under their digest in UPLOAD_DIR, so a file there named by one
+    is not read again. Anywhere else the name proves nothing (a renamed or partly written file) and the bytes are hashed.
+    """
     import hashlib
+    import re
+    from pathlib import Path
+
+    path = Path(file_path).resolve()
+    if path.parent == Path(UPLOAD_DIR).resolve() and re.fullmatch(
+        r"[0-9a-f]{64}", path.stem
+    ):
+        return path.stem
 
-    hash_id = hashlib.md5(doc_path.encode()).hexdigest()[:8]
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def get_user_doc_collection_name(doc_path: str) -> str:
+    """Generate a content-addressed collection name for user docs, so identical uploads share a collection."""
+    hash_id = file_content_hash(doc_path)[:16]
     return f"user_doc_{hash_id}"
 
 
 def retrieve_filtered_documents(
     vectorstore: Chroma, query: str, k: int = 5, threshold: float = 0
 ) -> List[Document]:
-    """Retrieve docs filtering by relevance score."""
-    results = vectorstore.similarity_search_with_relevance_scores(query=query, k=k)
-    return [doc for doc, score in results if score >= threshold]
+    """Retrieve docs filtering by relevance score. The score is kept in the doc metadata as `relevance_score`."""
+    with timed("chroma", "similarity_search"):
+        results = vectorstore.similarity_search_with_relevance_scores(query=query, k=k)
+    docs = []
+    for doc, score in results:
+        if score >= threshold:
+            doc.metadata["relevance_score"] = score
+            docs.append(doc)
+    return docs
 
 
 def md(string):
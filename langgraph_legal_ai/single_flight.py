@@ -0,0 +1,97 @@
+#
+# Coalescing of identical in-flight graph runs
+#
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Hashable, Optional
+
+REQUEST_RESULT_TTL = int(os.getenv("REQUEST_RESULT_TTL", "900"))
+REQUEST_RESULT_MAX = int(os.getenv("REQUEST_RESULT_MAX", "256"))
+
+
+class SingleFlight:
+    """
+    Runs one execution per key at a time and shares its result with every caller that asks for the same key meanwhile.
+
+    Results are also remembered by client request id for `result_ttl` seconds, so a retry
+    that arrives after the first call finished (or timed out on the client) gets the same answer.
+    """
+
+    def __init__(
+        self,
+        result_ttl: int = REQUEST_RESULT_TTL,
+        max_results: int = REQUEST_RESULT_MAX,
+    ):
+        self.result_ttl = result_ttl
+        self.max_results = max_results
+        self.in_flight = {}
+        self.request_ids = {}
+        self.results = OrderedDict()
+        self.coalesced = 0
+        self.replayed = 0
+
+    async def run(
+        self,
+        key: Hashable,
+        factory: Callable[[], Awaitable[dict]],
+        request_id: Optional[str] = None,
+    ) -> dict:
+        """
+        Return the result for `key`, starting `factory()` only if no identical run is in flight.
+
+        Parameters:
+        key (Hashable): Identity of the run.
+        factory (Callable): Starts the run when nothing can be reused.
+        request_id (Optional[str]): Client supplied id of the request, reused on retries.
+
+        Returns:
+        dict: The result of the shared run.
+        """
+        if request_id:
+            cached = self.results.get(request_id)
+            if cached and cached[0] > time.monotonic():
+                self.replayed += 1
+                return cached[1]
+            # A retry of a request that is still running joins the original run
+            key = self.request_ids.get(request_id, key)
+
+        task = self.in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(factory())
+            self.in_flight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.coalesced += 1
+
+        if request_id:
+            self.request_ids[request_id] = key
+
+        # Shielded so one caller disconnecting does not cancel the run for the others
+        return await asyncio.shield(task)
+
+    def metrics(self) -> dict:
+        return {
+            "in_flight": len(self.in_flight),
+            "coalesced": self.coalesced,
+            "replayed": self.replayed,
+            "remembered_results": len(self.results),
+        }
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        self.in_flight.pop(key, None)
+        request_ids = [rid for rid, k in self.request_ids.items() if k == key]
+        for request_id in request_ids:
+            del self.request_ids[request_id]
+
+        if task.cancelled() or task.exception() is not None:
+            return
+
+        expires = time.monotonic() + self.result_ttl
+        for request_id in request_ids:
+            self.results[request_id] = (expires, task.result())
+            self.results.move_to_end(request_id)
+        while len(self.results) > self.max_results:
+            self.results.popitem(last=False)
@@ -13,6 +13,67 @@ interface Message {
     timestamp: Date;
 }
 
+// Backoff between retries of a failed request, unless the server sends Retry-After
+const RETRY_DELAYS_MS = [1000, 3000];
+
+const isRetryable = (error: unknown) =>
+    axios.isAxiosError(error) && (!error.response || [429, 502, 503, 504].includes(error.response.status));
+
+// Posts the same form, and so the same request_id, again after network errors and busy replies
+async function postWithRetry<T>(url: string, formData: FormData) {
+    for (let attempt = 0; ; attempt++) {
+        try {
+            return await axios.post<T>(url, formData);
+        } catch (error) {
+            if (attempt >= RETRY_DELAYS_MS.length || !isRetryable(error)) throw error;
+            const retryAfter = Number(axios.isAxiosError(error) && error.response?.headers["retry-after"]);
+            await new Promise((resolve) => setTimeout(resolve, retryAfter > 0 ? retryAfter * 1000 : RETRY_DELAYS_MS[attempt]));
+        }
+    }
+}
+
+const VOICE_PLAYBACK_RATE = 1.25;
+
+const appendChunk = (sourceBuffer: SourceBuffer, chunk: BufferSource) =>
+    new Promise<void>((resolve, reject) => {
+        sourceBuffer.addEventListener("updateend", () => resolve(), { once: true });
+        sourceBuffer.addEventListener("error", () => reject(new Error("Audio append failed")), { once: true });
+        sourceBuffer.appendBuffer(chunk);
+    });
+
+// Plays an audio/mpeg response while it downloads, starting with its first sentence.
+// Falls back to playing the whole reply once downloaded where MediaSource cannot play MP3.
+async function playAudioStream(res: Response) {
+    if (!res.body || typeof MediaSource === "undefined" || !MediaSource.isTypeSupported("audio/mpeg")) {
+        const audio = new Audio(URL.createObjectURL(await res.blob()));
+        audio.playbackRate = VOICE_PLAYBACK_RATE;
+        await audio.play();
+        return;
+    }
+
+    const mediaSource = new MediaSource();
+    const audio = new Audio(URL.createObjectURL(mediaSource));
+    audio.playbackRate = VOICE_PLAYBACK_RATE;
+    await new Promise((resolve) => mediaSource.addEventListener("sourceopen", resolve, { once: true }));
+
+    const sourceBuffer = mediaSource.addSourceBuffer("audio/mpeg");
+    // Each sentence is a separate MP3, so they are appended back to back rather than by timestamp
+    sourceBuffer.mode = "sequence";
+
+    const reader = res.body.getReader();
+    let playing = false;
+    for (;;) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        await appendChunk(sourceBuffer, value);
+        if (!playing) {
+            playing = true;
+            audio.play().catch(() => toast.error("Audio playback blocked"));
+        }
+    }
+    if (mediaSource.readyState === "open") mediaSource.endOfStream();
+}
+
 function LegalAIChat() {
     const { id: urlId } = useParams<{ id: string }>();
     const navigate = useNavigate();
@@ -25,6 +86,8 @@ function LegalAIChat() {
     const [query, setQuery] = useState<string>("");
     const [loading, setLoading] = useState(false);
     const [isRecording, setIsRecording] = useState(false);
+    // Set synchronously, unlike `loading`, so a double click cannot submit the same message twice
+    const submitting = useRef(false);
 
     const mediaRecorder = useRef<MediaRecorder | null>(null);
     const audioChunks = useRef<Blob[]>([]);
@@ -52,8 +115,10 @@ function LegalAIChat() {
     const triggerFileSelect = () => fileInputRef.current?.click();
 
     const handleSubmit = async () => {
-        if (!query.trim()) return;
+        if (!query.trim() || submitting.current) return;
+        submitting.current = true;
 
+        // One id per logical submission, reused by every retry of it
         const userMsg: Message = { id: uuidv4(), role: 'user', content: query, timestamp: new Date() };
         setMessages((prev) => [...prev, userMsg]);
 
@@ -65,12 +130,14 @@ function LegalAIChat() {
         const formData = new FormData();
         if (file) formData.append("file", file);
         formData.append("user_query", activeQuery);
+        // Lets the backend reuse the in-flight or finished run if this submit is retried
+        formData.append("request_id", userMsg.id);
 
-        // Only include thread_id if we already have one from backend/URL
+        // Only include thread_id if we already have one from backend/URL; without it the backend derives it from request_id
         if (sessionThreadId) formData.append("thread_id", sessionThreadId);
 
         try {
-            const res = await axios.post("http://localhost:8000/api/text", formData);
+            const res = await postWithRetry<{ result: string; thread_id?: string }>("http://localhost:8000/api/text", formData);
             setMessages((prev) => [
                 ...prev,
                 { id: Math.random().toString(36).slice(2), role: 'assistant', content: res.data.result, timestamp: new Date() },
@@ -84,6 +151,7 @@ function LegalAIChat() {
         } catch {
             toast.error("Failed to get response");
         } finally {
+            submitting.current = false;
             setLoading(false);
         }
     };
@@ -112,17 +180,16 @@ function LegalAIChat() {
         if (sessionThreadId) formData.append("thread_id", sessionThreadId);
 
         try {
-            const res = await axios.post("http://localhost:8000/api/voice", formData);
-            const { audio_base64, ai_text, thread_id } = res.data;
-
-            // Handle Audio Playback
-            const binary = atob(audio_base64);
-            const bytes = new Uint8Array(binary.length);
-            for (let i = 0; i < binary.length; i++) bytes[i] = binary.charCodeAt(i);
-            const audioUrl = URL.createObjectURL(new Blob([bytes], { type: "audio/mpeg" }));
-            const audio = new Audio(audioUrl);
-            audio.playbackRate = 1.25;
-            audio.play();
+            const res = await fetch("http://localhost:8000/api/voice", { method: "POST", body: formData });
+            if (!res.ok) throw new Error(`Voice request failed: ${res.status}`);
+            const thread_id = res.headers.get("x-thread-id");
+
+            // Start speaking while the later sentences are still being synthesised
+            const playback = playAudioStream(res).catch(() => toast.error("Audio playback failed"));
+
+            // The full analysis is too large for a header, so it is fetched by thread id
+            const result = await axios.get(`http://localhost:8000/api/voice/${thread_id}/result`);
+            const ai_text = result.data.result;
 
             setMessages((prev) => [
                 ...prev,
@@ -135,6 +202,7 @@ function LegalAIChat() {
                 setSessionThreadId(thread_id);
                 navigate(`/${thread_id}`, { replace: true });
             }
+            await playback;
         } catch {
             toast.error("Voice processing failed");
         } finally {
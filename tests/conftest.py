@@ -0,0 +1,13 @@
+#
+# Test setup: the graph is imported offline, against a scratch data directory
+#
+
+import pytest
+from fakes import isolate_environment
+
+isolate_environment()
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
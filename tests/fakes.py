@@ -0,0 +1,349 @@
+#
+# Offline Stand-ins for the Model Endpoint and the Embedding Model
+#
+# Shared by the tests and the benchmarks. Call `isolate_environment()` before anything
+# from `legal_modules` is imported: it points the data directories at a scratch directory
+# and replaces the HuggingFace embedding model, which would otherwise be downloaded.
+#
+
+import asyncio
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+import tempfile
+import time
+import warnings
+from collections import Counter, defaultdict
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+GRAPH_DIR = REPO_DIR / "langgraph_legal_ai"
+SERVER_DIR = REPO_DIR / "fastapi_server"
+
+EMBEDDING_SIZE = 384
+
+
+def isolate_environment(data_dir: str = None) -> Path:
+    """
+    Prepare the process to import the graph without network access or touching the repository data.
+
+    Parameters:
+    data_dir (str): Scratch directory for Chroma, checkpoints and caches. A new temporary directory if not given.
+
+    Returns:
+    Path: The data directory in use.
+    """
+    data_dir = Path(data_dir or tempfile.mkdtemp(prefix="legal-ai-"))
+    (data_dir / "db").mkdir(parents=True, exist_ok=True)
+
+    os.environ["LEGAL_DATA_DIR"] = str(data_dir)
+    os.environ["LEGAL_UPLOAD_DIR"] = str(data_dir / "uploads")
+    os.environ.setdefault("OPENAI_API_KEY", "sk-offline")
+    # Every benchmarked call should reach the fake endpoint
+    os.environ.setdefault("LLM_CACHE_NODES", "")
+
+    for path in (GRAPH_DIR, SERVER_DIR):
+        if str(path) not in sys.path:
+            sys.path.insert(0, str(path))
+
+    import langchain_huggingface
+
+    langchain_huggingface.HuggingFaceEmbeddings = HashEmbeddings
+    # Bag-of-words similarities of unrelated texts can dip below zero
+    warnings.filterwarnings("ignore", message="Relevance scores must be between")
+    return data_dir
+
+
+class HashEmbeddings:
+    """
+    Deterministic bag-of-words embeddings: every word is hashed into one of EMBEDDING_SIZE buckets.
+    Texts sharing words are close, so similarity thresholds behave roughly like with a real model.
+    """
+
+    def __init__(self, **kwargs):
+        pass
+
+    def embed_query(self, text: str) -> list:
+        vector = [0.0] * EMBEDDING_SIZE
+        for word in re.findall(r"\w+", text.lower()):
+            bucket = int(hashlib.md5(word.encode()).hexdigest(), 16) % EMBEDDING_SIZE
+            vector[bucket] += 1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: list) -> list:
+        return [self.embed_query(text) for text in texts]
+
+
+TOPICS = [
+    "termination of employment without notice",
+    "refund of a security deposit by a landlord",
+    "breach of a non-compete clause",
+    "consumer complaint against a defective product",
+    "cheque dishonour under the Negotiable Instruments Act",
+    "maintenance claims after divorce",
+    "anticipatory bail for a non-bailable offence",
+    "copyright infringement of software",
+]
+
+# A fixed query set, one question per synthetic topic
+QUERIES = [f"What does the law say about {topic}?" for topic in TOPICS]
+
+
+def seed_corpus(db, size: int = 40):
+    """Fill an empty legal collection with synthetic provisions and cases so retrieval returns documents."""
+    from langchain_core.documents import Document
+
+    if db._collection.count():
+        return
+
+    docs = []
+    for i in range(size):
+        topic = TOPICS[i % len(TOPICS)]
+        metadata = {"source": f"synthetic-{i}", "section": f"Section {i + 1}"}
+        if i % 4 == 0:
+            metadata["case_name"] = f"Synthetic Case {i} v. State"
+        docs.append(
+            Document(
+                page_content=f"Section {i + 1} on {topic}. What the law says about {topic}: "
+                + "the provision sets out the rights, duties and remedies of the parties. "
+                * 8,
+                metadata=metadata,
+            )
+        )
+    db.add_documents(docs, ids=[f"synthetic-{i}" for i in range(size)])
+
+
+# Replies of the fake endpoint per node, in the formats the node prompts ask for
+DEFAULT_ACTIONS = [
+    "compliance_and_loophole_validator",
+    "precedent_matcher",
+    "risk_and_remediation_assessor",
+    "consistency_auditor_and_cite",
+]
+
+VERDICT = (
+    "## Verdict\n\nThe action is permitted under the applicable provisions. "
+    "The employer must give one month's notice or pay wages in lieu of notice. "
+    "A dismissal without either is wrongful and the employee may claim compensation. "
+    "The claim should be filed before the labour court within the limitation period."
+)
+
+SUMMARY = (
+    "The action is permitted if notice is given. "
+    "Without notice, the employee may claim compensation. "
+    "File the claim within the limitation period."
+)
+
+
+def default_reply(node_name: str, prompt: str, actions_needed: list) -> str:
+    """The reply a well-behaved model would give to a node's prompt."""
+    if node_name == "decompose_to_analysis_units":
+        query = re.search(r"User Query: (.*)", prompt)
+        return json.dumps(
+            {
+                "intent": "general",
+                "confidence": 0.9,
+                "rationale": "Offline stand-in.",
+                "query_related_to_legal_context": True,
+                "optimised_query": query.group(1).strip() if query else prompt[:100],
+                "actions_needed": actions_needed,
+            }
+        )
+    if node_name == "compliance_and_loophole_validator":
+        return json.dumps(
+            {
+                "findings": [
+                    {
+                        "clause": "Termination clause",
+                        "status": "non_compliant",
+                        "key_issue": "No notice period",
+                        "relevant_law": "Section 25F",
+                        "associated_loophole": {
+                            "type": "none",
+                            "description": "",
+                            "severity": "low",
+                        },
+                    }
+                ],
+                "doctrinal_summary": "Termination without notice is not compliant.",
+                "loophole_summary": "None found.",
+            }
+        )
+    if node_name == "precedent_matcher":
+        return json.dumps(
+            [
+                {
+                    "case_name": "Synthetic Case 0 v. State",
+                    "relevance_score": "high",
+                    "matching_principle": "Notice before termination",
+                }
+            ]
+        )
+    if node_name == "risk_and_remediation_assessor":
+        return json.dumps(
+            {
+                "risk_assessment": {
+                    "overall_risk": "medium",
+                    "score": 5,
+                    "rationale": "Compensation claims are likely.",
+                },
+                "remediation_suggestions": ["Pay wages in lieu of notice."],
+            }
+        )
+    if node_name == "synthesize_verdict":
+        return VERDICT
+    if node_name == "consistency_auditor_and_cite":
+        return json.dumps({"contradiction_score": 5, "confidence": 90, "issues": []})
+    return SUMMARY
+
+
+class FakeLLMEndpoint:
+    """
+    Stands in for the chat completions endpoint by patching ChatOpenAI's request methods.
+
+    Everything above the HTTP call stays real: the node models from `get_llm`, the per-attempt
+    timeout, retries, hedging, the governor, callbacks and metrics. Each call sleeps for the
+    node's latency and returns its reply, streamed word by word on the streaming path.
+
+    Parameters:
+    latency: Seconds per call, or a callable (node_name, attempt) -> seconds.
+    replies (dict): Node name -> reply text, or a callable (prompt, kwargs) -> AIMessage.
+    actions_needed (list): The actions the fake decomposition selects.
+    """
+
+    def __init__(self, latency=0.05, replies: dict = None, actions_needed: list = None):
+        self.latency = latency
+        self.replies = replies or {}
+        self.actions_needed = (
+            DEFAULT_ACTIONS if actions_needed is None else actions_needed
+        )
+        self.calls = Counter()
+        self.streamed_calls = Counter()
+        self.latencies = defaultdict(list)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.patched = None
+
+    def install(self):
+        from langchain_openai import ChatOpenAI
+
+        endpoint = self
+        self.patched = (ChatOpenAI._agenerate, ChatOpenAI._astream)
+
+        async def _agenerate(model, messages, stop=None, run_manager=None, **kwargs):
+            message = await endpoint.respond(model, messages, kwargs)
+            return endpoint.chat_result(message)
+
+        async def _astream(model, messages, stop=None, run_manager=None, **kwargs):
+            from langchain_core.messages import AIMessageChunk
+            from langchain_core.outputs import ChatGenerationChunk
+
+            message = await endpoint.respond(model, messages, kwargs, streamed=True)
+            if message.tool_calls:
+                yield ChatGenerationChunk(
+                    message=AIMessageChunk(
+                        content="",
+                        tool_call_chunks=[
+                            {
+                                "name": call["name"],
+                                "args": json.dumps(call["args"]),
+                                "id": call["id"],
+                                "index": i,
+                            }
+                            for i, call in enumerate(message.tool_calls)
+                        ],
+                    )
+                )
+                return
+            # LangChain reports each chunk to the callbacks itself
+            for token in re.findall(r"\S+\s*", message.content):
+                yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+        ChatOpenAI._agenerate = _agenerate
+        ChatOpenAI._astream = _astream
+        return self
+
+    def uninstall(self):
+        from langchain_openai import ChatOpenAI
+
+        if self.patched:
+            ChatOpenAI._agenerate, ChatOpenAI._astream = self.patched
+            self.patched = None
+
+    def __enter__(self):
+        return self.install()
+
+    def __exit__(self, *exc):
+        self.uninstall()
+
+    def reset(self):
+        self.calls.clear()
+        self.streamed_calls.clear()
+        self.latencies.clear()
+        self.max_in_flight = 0
+
+    async def respond(self, model, messages, kwargs, streamed: bool = False):
+        from langchain_core.messages import AIMessage
+
+        node_name = getattr(model, "node_name", "default")
+        self.calls[node_name] += 1
+        if streamed:
+            self.streamed_calls[node_name] += 1
+
+        latency = (
+            self.latency(node_name, self.calls[node_name])
+            if callable(self.latency)
+            else self.latency
+        )
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        started = time.perf_counter()
+        try:
+            await asyncio.sleep(latency)
+        finally:
+            self.in_flight -= 1
+            self.latencies[node_name].append(time.perf_counter() - started)
+
+        prompt = "\n".join(str(m.content) for m in messages)
+        reply = self.replies.get(node_name)
+        if callable(reply):
+            return reply(prompt, kwargs)
+        if reply is None:
+            reply = default_reply(node_name, prompt, self.actions_needed)
+        return AIMessage(content=reply)
+
+    @staticmethod
+    def chat_result(message):
+        from langchain_core.outputs import ChatGeneration, ChatResult
+
+        prompt_tokens, completion_tokens = 500, max(1, len(message.content) // 4)
+        return ChatResult(
+            generations=[ChatGeneration(message=message)],
+            llm_output={
+                "token_usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                }
+            },
+        )
+
+
+def tool_call_reply(name: str, args: dict):
+    """A reply that calls the tool `name`, for FakeLLMEndpoint.replies."""
+    from langchain_core.messages import AIMessage
+
+    return lambda prompt, kwargs: AIMessage(
+        content="",
+        tool_calls=[{"name": name, "args": args, "id": f"call_{name}"}],
+    )
+
+
+def percentile(samples: list, q: float) -> float:
+    """The q-quantile of the samples, nearest rank."""
+    ordered = sorted(samples)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)] if ordered else 0.0
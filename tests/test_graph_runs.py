@@ -0,0 +1,129 @@
+#
+# Whole graph runs through the wrapper against the fake model endpoint
+#
+
+import json
+import uuid
+
+import legal_agent_wrapper as wrapper
+import pytest
+from fakes import DEFAULT_ACTIONS, FakeLLMEndpoint, default_reply, seed_corpus
+from langchain_core.messages import AIMessage
+from legal_modules import node_helpers, resilience
+from legal_modules.answer_cache import SemanticAnswerCache
+from legal_modules.setup import db
+
+
+@pytest.fixture(autouse=True)
+async def app(monkeypatch):
+    monkeypatch.setattr(resilience, "backoff_delay", lambda attempt: 0)
+    seed_corpus(db)
+    yield await wrapper.get_app()
+    # The checkpointer's connection belongs to this test's event loop
+    await wrapper.close_app()
+
+
+def failing(prompt: str, kwargs: dict) -> AIMessage:
+    raise RuntimeError("summariser unavailable")
+
+
+async def run(
+    query: str, thread_id: str, priority: str = "text", bypass_cache: bool = True
+) -> dict:
+    response = await wrapper.execute_graph(
+        wrapper.GraphRequest(
+            query=query,
+            thread_id=thread_id,
+            priority=priority,
+            bypass_cache=bypass_cache,
+        )
+    )
+    return response["result"]
+
+
+@pytest.mark.anyio
+async def test_failed_voice_summary_keeps_the_verdict():
+    with FakeLLMEndpoint(latency=0, replies={"chain_summariser": failing}):
+        result = await run(
+            "Can my employer dismiss me without notice?",
+            str(uuid.uuid4()),
+            priority="voice",
+        )
+
+    assert result["final_response"].startswith("## Verdict")
+    assert result["voice_summary"] is None
+
+
+def not_legal(prompt: str, kwargs: dict) -> AIMessage:
+    reply = json.loads(
+        default_reply("decompose_to_analysis_units", prompt, DEFAULT_ACTIONS)
+    )
+    return AIMessage(
+        content=json.dumps({**reply, "query_related_to_legal_context": False})
+    )
+
+
+@pytest.mark.anyio
+async def test_follow_up_that_is_not_legal_does_not_repeat_the_last_answer():
+    thread_id = str(uuid.uuid4())
+    with FakeLLMEndpoint(latency=0):
+        first = await run(
+            "Can my employer dismiss me without notice?", thread_id, priority="voice"
+        )
+    with FakeLLMEndpoint(latency=0, replies={"decompose_to_analysis_units": not_legal}):
+        second = await run("What is the weather today?", thread_id, priority="voice")
+
+    assert first["voice_summary"] and first["citations"]
+    assert second["final_response"].startswith("Query is not Related")
+    assert second["voice_summary"] is None
+    assert second["citations"] == []
+    assert second["consistency_score"] is None
+
+
+@pytest.mark.anyio
+async def test_answer_cache_keeps_only_answers_without_chat_history(monkeypatch):
+    cache = SemanticAnswerCache()
+    monkeypatch.setattr(node_helpers, "answer_cache", cache)
+    first, follow_up = (
+        "Can my employer dismiss me without notice?",
+        "Can I claim compensation for it?",
+    )
+    thread_id = str(uuid.uuid4())
+
+    with FakeLLMEndpoint(latency=0):
+        answered = await run(first, thread_id, bypass_cache=False)
+        await run(follow_up, thread_id, bypass_cache=False)
+        assert len(cache.entries) == 1
+
+        # Another thread asking the first question gets the cached verdict and its audit score
+        cached = await run(first, str(uuid.uuid4()), bypass_cache=False)
+
+    assert cache.hits == 1
+    assert cached["consistency_score"] == answered["consistency_score"] == 90
+
+
+@pytest.mark.anyio
+async def test_second_turn_response_projects_only_this_runs_fields():
+    thread_id = str(uuid.uuid4())
+    with FakeLLMEndpoint(latency=0):
+        await run(
+            "Can my employer dismiss me without notice?", thread_id, priority="voice"
+        )
+    with FakeLLMEndpoint(latency=0, replies={"decompose_to_analysis_units": not_legal}):
+        response = await wrapper.run_legal_graph(
+            wrapper.GraphRequest(
+                query="What is the weather today?",
+                thread_id=thread_id,
+                priority="voice",
+            )
+        )
+
+    body = json.loads(response.body)
+    assert list(body["result"]) == wrapper.DEFAULT_RESULT_FIELDS
+    assert body["result"] == {
+        "final_response": "Query is not Related to Legal Context. Please ask Legal Questions.",
+        "voice_summary": None,
+        "citations": [],
+        "consistency_score": None,
+        "degradations": [],
+    }
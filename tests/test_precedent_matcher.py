@@ -0,0 +1,141 @@
+#
+# LLM calls made by the precedent matcher on each of its paths
+#
+
+import json
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeMessagesListChatModel
+from langchain_core.messages import AIMessage
+from legal_modules import node_helpers
+
+MATCH = {
+    "case_name": "Synthetic Case 0 v. State",
+    "relevance_score": "high",
+    "matching_principle": "Notice before termination",
+}
+
+
+class CountingChatModel(FakeMessagesListChatModel):
+    """Replies with `responses` in order and counts the calls. Tools are accepted and ignored."""
+
+    calls: int = 0
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        return await super()._agenerate(messages, stop, run_manager, **kwargs)
+
+
+class FakeSearchTool:
+    """Stands in for web_search_tool with fixed results."""
+
+    def __init__(self, results: list):
+        self.results = results
+        self.queries = []
+
+    async def ainvoke(self, args: dict) -> dict:
+        self.queries.append(args["query"])
+        return {"results": self.results}
+
+
+def search_call(query: str) -> AIMessage:
+    return AIMessage(
+        content="",
+        tool_calls=[
+            {"name": "web_search_tool", "args": {"query": query}, "id": "call_search"}
+        ],
+    )
+
+
+def matches_call(matches: list) -> AIMessage:
+    return AIMessage(
+        content="",
+        tool_calls=[
+            {
+                "name": "PrecedentMatches",
+                "args": {"matches": matches},
+                "id": "call_matches",
+            }
+        ],
+    )
+
+
+@pytest.fixture
+def model(monkeypatch):
+    """One fake model behind both the tool-calling and the structured precedent matcher."""
+
+    def install(responses: list) -> CountingChatModel:
+        fake = CountingChatModel(responses=responses)
+        monkeypatch.setattr(node_helpers, "websearch_llm", fake)
+        monkeypatch.setattr(node_helpers, "get_llm", lambda node_name: fake)
+        return fake
+
+    return install
+
+
+async def match(**kwargs) -> dict:
+    return await node_helpers.match_precedent(
+        "Can an employee be dismissed without notice?",
+        [],
+        "Case: Synthetic Case 0 v. State\nNotice is required before termination.",
+        **kwargs,
+    )
+
+
+@pytest.mark.anyio
+async def test_local_cases_take_one_call(model):
+    fake = model([AIMessage(content=json.dumps([MATCH]))])
+
+    result = await match()
+
+    assert fake.calls == 1
+    assert result["precedent_matches"] == [MATCH]
+
+
+@pytest.mark.anyio
+async def test_web_search_takes_two_calls(model, monkeypatch):
+    search = FakeSearchTool(
+        [{"title": "Notice case", "url": "https://example.org", "content": "..."}]
+    )
+    monkeypatch.setattr(node_helpers, "web_search_tool", search)
+    fake = model(
+        [
+            search_call("dismissal without notice precedent"),
+            matches_call([MATCH]),
+        ]
+    )
+
+    result = await match()
+
+    assert fake.calls == 2
+    assert search.queries == ["dismissal without notice precedent"]
+    assert result["precedent_matches"] == [MATCH]
+
+
+@pytest.mark.anyio
+async def test_empty_web_search_matches_the_local_cases(model, monkeypatch):
+    monkeypatch.setattr(node_helpers, "web_search_tool", FakeSearchTool([]))
+    fake = model(
+        [
+            search_call("dismissal without notice precedent"),
+            matches_call([MATCH]),
+        ]
+    )
+
+    result = await match()
+
+    assert fake.calls == 2
+    assert result["precedent_matches"] == [MATCH]
+
+
+@pytest.mark.anyio
+async def test_without_web_search_takes_one_call(model):
+    fake = model([AIMessage(content=json.dumps({"matches": [MATCH]}))])
+
+    result = await match(allow_web_search=False)
+
+    assert fake.calls == 1
+    assert result["precedent_matches"] == [MATCH]
@@ -0,0 +1,147 @@
+#
+# Timeouts, retries and hedging of ResilientChatOpenAI against a fake-latency endpoint
+#
+
+import asyncio
+import time
+import uuid
+
+import pytest
+from fakes import percentile
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_openai import ChatOpenAI
+from legal_modules import resilience
+from legal_modules.governor import LLMGovernor
+from legal_modules.setup import create_llm
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(resilience, "backoff_delay", lambda attempt: 0)
+
+
+class SlowEndpoint:
+    """Replaces ChatOpenAI's request methods with sleeps of `latency(call)` seconds, call counting from 1."""
+
+    def __init__(self, monkeypatch, latency):
+        self.latency = latency
+        self.calls = 0
+        monkeypatch.setattr(ChatOpenAI, "_agenerate", self._agenerate)
+        monkeypatch.setattr(ChatOpenAI, "_astream", self._astream)
+
+    async def _agenerate(self, model, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.latency(self.calls))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="ok"))])
+
+    async def _astream(self, model, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        call = self.calls
+        for token in ("first ", "second"):
+            await asyncio.sleep(self.latency(call) if token == "first " else 0)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+            # The second chunk of a "stalled" call never arrives in time
+            if self.latency(call) < 0:
+                await asyncio.sleep(10)
+
+
+def model(**overrides):
+    # A fresh node name per test keeps the latency history of the attempt stats apart
+    return create_llm(
+        "fast", node_name=f"test-{uuid.uuid4().hex[:8]}", max_tokens=16, **overrides
+    )
+
+
+async def timed_calls(llm, count: int) -> list:
+    latencies = []
+    for _ in range(count):
+        started = time.perf_counter()
+        await llm.ainvoke("Is a dismissal without notice lawful?")
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+@pytest.mark.anyio
+async def test_hedging_cuts_the_tail(monkeypatch):
+    slow = {"enabled": False}
+    # Every tenth request stalls once the history is warm
+    SlowEndpoint(
+        monkeypatch,
+        lambda call: 0.5 if slow["enabled"] and call % 10 == 0 else 0.01,
+    )
+
+    plain, hedged = model(), model(hedge=True)
+    await timed_calls(plain, resilience.LLM_HEDGE_MIN_SAMPLES)
+    await timed_calls(hedged, resilience.LLM_HEDGE_MIN_SAMPLES)
+    slow["enabled"] = True
+
+    plain_p95 = percentile(await timed_calls(plain, 40), 0.95)
+    hedged_p95 = percentile(await timed_calls(hedged, 40), 0.95)
+
+    assert plain_p95 >= 0.5
+    assert hedged_p95 < 0.2
+    assert resilience.attempt_stats.counts[hedged.node_name]["hedges_won"] >= 1
+
+
+@pytest.mark.anyio
+async def test_timed_out_attempt_is_retried(monkeypatch):
+    endpoint = SlowEndpoint(monkeypatch, lambda call: 1.0 if call == 1 else 0.01)
+    llm = model(timeout=0.1)
+
+    started = time.perf_counter()
+    reply = await llm.ainvoke("Is a dismissal without notice lawful?")
+
+    assert reply.content == "ok"
+    assert endpoint.calls == 2
+    assert time.perf_counter() - started < 0.5
+    assert resilience.attempt_stats.counts[llm.node_name]["timeouts"] == 1
+
+
+@pytest.mark.anyio
+async def test_streamed_attempt_is_retried_before_its_first_chunk(monkeypatch):
+    endpoint = SlowEndpoint(monkeypatch, lambda call: 1.0 if call == 1 else 0.01)
+    llm = model(timeout=0.1)
+
+    chunks = [chunk.content async for chunk in llm.astream("Is it lawful?")]
+
+    assert "".join(chunks) == "first second"
+    assert endpoint.calls == 2
+
+
+@pytest.mark.anyio
+async def test_streamed_attempt_is_not_retried_after_its_first_chunk(monkeypatch):
+    endpoint = SlowEndpoint(monkeypatch, lambda call: -1)
+    llm = model(timeout=0.1)
+
+    chunks = []
+    with pytest.raises(asyncio.TimeoutError):
+        async for chunk in llm.astream("Is it lawful?"):
+            chunks.append(chunk.content)
+
+    assert chunks == ["first "]
+    assert endpoint.calls == 1
+
+
+@pytest.mark.anyio
+async def test_streamed_calls_wait_for_the_governor(monkeypatch):
+    governor = LLMGovernor(max_concurrent=2)
+    monkeypatch.setattr(resilience, "llm_governor", governor)
+    in_flight = []
+
+    def latency(call):
+        in_flight.append(governor.in_flight)
+        return 0.05
+
+    SlowEndpoint(monkeypatch, latency)
+    llm = model()
+
+    async def stream():
+        return [chunk.content async for chunk in llm.astream("Is it lawful?")]
+
+    replies = await asyncio.gather(*(stream() for _ in range(6)))
+
+    assert all("".join(chunks) == "first second" for chunks in replies)
+    assert max(in_flight) == 2
+    assert governor.granted == 6
+    assert governor.in_flight == 0
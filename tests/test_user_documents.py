@@ -0,0 +1,54 @@
+#
+# Content-addressed storage and ingestion of user documents
+#
+
+import hashlib
+from pathlib import Path
+
+from langchain_chroma import Chroma
+from legal_modules import node_helpers
+from legal_modules.setup import UPLOAD_DIR, USER_DOCS_DIR, embeddings
+from legal_modules.utils import file_content_hash, get_user_doc_collection_name
+
+CONTRACT = (
+    "Section 1. The employee may be dismissed with one month of written notice. "
+    "Section 2. Either party may end the contract during the probation period without notice. "
+    "Section 3. Overtime is paid at one and a half times the hourly rate."
+)
+
+
+def test_hash_name_is_trusted_only_in_the_upload_directory(tmp_path):
+    claimed = hashlib.sha256(b"another document").hexdigest()
+    actual = hashlib.sha256(b"contract").hexdigest()
+
+    outside = tmp_path / f"{claimed}.pdf"
+    outside.write_bytes(b"contract")
+    stored = Path(UPLOAD_DIR) / f"{claimed}.pdf"
+    stored.parent.mkdir(parents=True, exist_ok=True)
+    stored.write_bytes(b"contract")
+
+    assert file_content_hash(str(outside)) == actual
+    assert file_content_hash(str(stored)) == claimed
+
+
+def test_partly_ingested_document_is_ingested_again(tmp_path):
+    path = tmp_path / "contract.pdf"
+    path.write_bytes(CONTRACT.encode())
+    collection_name = get_user_doc_collection_name(str(path))
+    # A failed ingestion left one chunk and no completion marker
+    Chroma(
+        collection_name=collection_name,
+        persist_directory=USER_DOCS_DIR,
+        embedding_function=embeddings,
+    ).add_texts(["Section 1. The employee may be dismissed"])
+
+    node_helpers.ingest_user_document(CONTRACT, str(path))
+    collection = Chroma(
+        collection_name=collection_name,
+        persist_directory=USER_DOCS_DIR,
+        embedding_function=embeddings,
+    )._collection
+    chunks = collection.get(include=["metadatas"])["metadatas"]
+
+    assert collection.metadata == {"ingest_complete": True}
+    assert chunks and all(chunk["source"] == str(path) for chunk in chunks)